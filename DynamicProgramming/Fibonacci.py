@@ -1,4 +1,16 @@
-from typing import Dict
+import random
+import sys
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from Memo import ArrayMemo, DiskMemo, LRUMemo, Memo, ThreadSafeMemo
+from Memoize import dynamic_programming, measure
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed by the vectorized modular path of fib_batch
+    np = None
 
 
 def fib_rec(n: int) -> int:  #
@@ -17,18 +29,35 @@ def fib_rec(n: int) -> int:  #
     return fib_rec(n - 1) + fib_rec(n - 2)
 
 
-def fib_dp(n: int, memo: Dict[int, int] = {0: 0, 1: 1, 2: 1}) -> int:
+@dynamic_programming(order=lambda n: ((i,) for i in range(2, n)), window=lambda n: 3)
+def fib_step(recurse, n: int) -> int:
+    """
+    Recursive definition of the fibonacci numbers for the Memoize framework
+    fib_step(n) tabulates F(2) to F(n) bottom-up, fib_step.memoized(n) recurses top-down
+    """
+    if n <= 1:
+        return n
+    return recurse(n - 1) + recurse(n - 2)
+
+
+def fib_dp(n: int, memo: Union[Memo, LRUMemo, ThreadSafeMemo, Dict[int, int], None] = None) -> int:
     """
-    Finds nth fibonacci number - Recursive solution with Dynamic Programming technique using memoization
+    Finds nth fibonacci number - Dynamic Programming technique using memoization
+    The memo is tabulated bottom-up by fib_step: F(i) is computed for i = 2 to n, reusing memoized values,
+    so there is no recursion depth limit. The last values are kept besides the memo, so a bounded memo
+    of any capacity works.
     Time Complexity = O(n)
-    Space Complexity = O(n)
-    :param memo: A map to store already computed results
+    Space Complexity = O(n), or the capacity of a bounded memo
+    :param memo: Memo backend (see Memo.py) or a dict, a new Memo is used for this call only when None
     :param n:
     :return:
     """
-    if n not in memo:
-        memo[n] = fib_dp(n - 1, memo) + fib_dp(n - 2, memo)
-    return memo[n]
+    if n < 0:
+        print(f"Error: Invalid input")
+        return 0
+    if isinstance(memo, dict):
+        memo = Memo(memo)
+    return fib_step(n, memo=memo)
 
 
 def fib(n: int) -> int:
@@ -53,6 +82,315 @@ def fib(n: int) -> int:
     return current
 
 
+def fib_fast(n: int, mod: Optional[int] = None) -> int:
+    """
+    Finds nth fibonacci number - Fast doubling
+        F(2k) = F(k) * (2 * F(k + 1) - F(k))
+        F(2k + 1) = F(k)^2 + F(k + 1)^2
+    Walking the bits of n from the most significant one doubles k at each step (and adds 1 for a set bit)
+    Time Complexity = O(log n) arithmetic operations (big integer multiplications in exact mode)
+    Space Complexity = O(1)
+    :param n:
+    :param mod: Computes F(n) mod 'mod' when given, exact big integer otherwise
+    :return:
+    """
+    if n < 0:
+        print(f"Error: Invalid input")
+        return 0
+    return _fib_pair(n, mod)[0]
+
+
+def _fib_pair(n: int, mod: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Fast doubling, returns F(n) and F(n + 1)
+    :return:
+    """
+    a, b = 0, 1  # F(k), F(k + 1) with k = 0
+    for bit in bin(n)[2:]:
+        c = a * (2 * b - a)
+        d = a * a + b * b
+        if mod:
+            c %= mod
+            d %= mod
+        if bit == "1":
+            a, b = d, (c + d) % mod if mod else c + d
+        else:
+            a, b = c, d
+    return a, b
+
+
+def _matrix_multiply(x: Tuple[int, int, int, int], y: Tuple[int, int, int, int],
+                     mod: Optional[int]) -> Tuple[int, int, int, int]:
+    a, b, c, d = x
+    e, f, g, h = y
+    result = (a * e + b * g, a * f + b * h, c * e + d * g, c * f + d * h)
+    if mod:
+        return tuple(value % mod for value in result)
+    return result
+
+
+def fib_matrix(n: int, mod: Optional[int] = None) -> int:
+    """
+    Finds nth fibonacci number - Matrix power
+        [[1, 1], [1, 0]]^n = [[F(n + 1), F(n)], [F(n), F(n - 1)]]
+    computed by repeated squaring
+    Time Complexity = O(log n) matrix multiplications
+    Space Complexity = O(1)
+    :param n:
+    :param mod: Computes F(n) mod 'mod' when given, exact big integer otherwise
+    :return:
+    """
+    if n < 0:
+        print(f"Error: Invalid input")
+        return 0
+    result = (1, 0, 0, 1)
+    base = (1, 1, 1, 0)
+    while n:
+        if n & 1:
+            result = _matrix_multiply(result, base, mod)
+        base = _matrix_multiply(base, base, mod)
+        n >>= 1
+    return result[1] % mod if mod else result[1]
+
+
+@lru_cache(maxsize=128)
+def pisano_period(mod: int) -> int:
+    """
+    Period of the fibonacci sequence mod 'mod': F(n) mod m == F(n mod period) mod m
+    Found by iterating until the pair (0, 1) comes back, the period is at most 6 * mod
+    Time Complexity = O(mod)
+    :param mod:
+    :return:
+    """
+    if mod == 1:
+        return 1
+    a, b = 0, 1
+    for i in range(1, 6 * mod + 1):
+        a, b = b, (a + b) % mod
+        if a == 0 and b == 1:
+            return i
+    raise ValueError(f"no pisano period found for {mod}")
+
+
+def fib_mod(n: int, mod: int, pisano_limit: int = 10 ** 6) -> int:
+    """
+    Finds F(n) mod 'mod'
+    For a small modulus (up to pisano_limit) n is first reduced modulo the pisano period (computed once per modulus)
+    :param n:
+    :param mod:
+    :param pisano_limit: Largest modulus for which the pisano period is computed
+    :return:
+    """
+    if mod <= pisano_limit:
+        n %= pisano_period(mod)
+    return fib_fast(n, mod)
+
+
+# Largest modulus for which a * a + b * b, with a, b < mod, fits in an int64
+NUMPY_MAX_MOD = 2 ** 31
+
+
+def fib_batch(ns: Iterable[int], mod: Optional[int] = None):
+    """
+    Finds F(n) for every n of a batch
+    Exact mode: one sweep over the sorted distinct n, moving from F(k) to the next requested F(k + gap)
+        step by step for small gaps, or with the addition formulas for large ones
+            F(k + g) = F(k) * F(g + 1) + F(k - 1) * F(g)
+            F(k + g + 1) = F(k + 1) * F(g + 1) + F(k) * F(g)
+    Modular mode: fast doubling run on all the n at once with int64 NumPy arrays,
+        one vectorized step per bit of the largest n (needs NumPy, mod < 2^31 and every n < 2^63),
+        one fib_fast call per n otherwise
+    :param ns: Non-negative integers
+    :param mod: Computes F(n) mod 'mod' when given, exact big integers otherwise
+    :return: List of the results (ints) in the order of ns, in every mode
+    """
+    ns = list(ns)
+    if any(n < 0 for n in ns):
+        raise ValueError("n must be non-negative")
+    if mod:
+        if np is not None and mod < NUMPY_MAX_MOD and max(ns, default=0) < 2 ** 63:
+            return _fib_batch_numpy(np.asarray(ns, dtype=np.int64), mod).tolist()
+        return [fib_fast(n, mod) for n in ns]
+    results: Dict[int, int] = dict()
+    k, a, b = 0, 0, 1  # F(k), F(k + 1)
+    for target in sorted(set(ns)):
+        gap = target - k
+        if gap <= 64:
+            for _ in range(gap):
+                a, b = b, a + b
+        else:
+            f_gap, f_gap_next = _fib_pair(gap)
+            a, b = a * f_gap_next + (b - a) * f_gap, b * f_gap_next + a * f_gap
+        k = target
+        results[target] = a
+    return [results[n] for n in ns]
+
+
+def _fib_batch_numpy(ns, mod: int):
+    a = np.zeros(len(ns), dtype=np.int64)
+    b = np.ones(len(ns), dtype=np.int64) % mod
+    if len(ns) == 0:
+        return a
+    for shift in range(int(ns.max()).bit_length() - 1, -1, -1):
+        c = a * ((2 * b - a) % mod) % mod
+        d = (a * a + b * b) % mod
+        bit = ((ns >> shift) & 1).astype(bool)
+        # Leading zero bits keep (a, b) = (F(0), F(1)), so every n can walk the same number of bits
+        a = np.where(bit, d, c)
+        b = np.where(bit, (c + d) % mod, d)
+    return a
+
+
+def benchmark_batch(batch_size: int = 1000000, max_n: int = 10 ** 6, mod: int = 10 ** 9 + 7) -> None:
+    """
+    Throughput in queries/sec of fib_batch against one call per query
+    :return:
+    """
+    rng = random.Random(12)
+    ns = [rng.randrange(max_n) for _ in range(batch_size)]
+    start = time.perf_counter()
+    fib_batch(ns, mod)
+    elapsed = time.perf_counter() - start
+    print(f"mod, batch = {batch_size:,}, max n = {max_n:,}: fib_batch = {batch_size / elapsed:,.0f} queries/sec")
+    sample = ns[:10000]
+    start = time.perf_counter()
+    for n in sample:
+        fib_fast(n, mod)
+    elapsed = time.perf_counter() - start
+    print(f"mod, one fib_fast call per query = {len(sample) / elapsed:,.0f} queries/sec")
+    exact_ns = [rng.randrange(10000) for _ in range(100000)]
+    start = time.perf_counter()
+    fib_batch(exact_ns)
+    elapsed = time.perf_counter() - start
+    print(f"exact, batch = {len(exact_ns):,}, max n = 10,000: fib_batch = {len(exact_ns) / elapsed:,.0f} queries/sec")
+    sample = exact_ns[:1000]
+    start = time.perf_counter()
+    for n in sample:
+        fib(n)
+    elapsed = time.perf_counter() - start
+    print(f"exact, one fib call per query = {len(sample) / elapsed:,.0f} queries/sec")
+
+
+def benchmark(ns: List[int] = None, linear_max_n: int = 10 ** 6) -> None:
+    """
+    Compares fib (linear) with fib_fast and fib_matrix, exact and mod 10^9 + 7
+    fib is skipped above linear_max_n: its big integer additions make it quadratic in n
+    :return:
+    """
+    if ns is None:
+        ns = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+    mod = 10 ** 9 + 7
+    for n in ns:
+        timings = []
+        for name, function in [("fib", fib), ("fib_fast", fib_fast), ("fib_matrix", fib_matrix),
+                               ("fib_fast mod", lambda k: fib_fast(k, mod)),
+                               ("fib_mod", lambda k: fib_mod(k, mod))]:
+            if function is fib and n > linear_max_n:
+                timings.append(f"{name} = skipped")
+                continue
+            start = time.perf_counter()
+            function(n)
+            timings.append(f"{name} = {time.perf_counter() - start:.4f}s")
+        print(f"n = {n:>10,}: " + ", ".join(timings))
+
+
+def benchmark_memo(ns: List[int] = None) -> None:
+    """
+    Time and peak memory of fib_step memoized top-down and tabulated onto each memo backend, against fib
+    Top-down is skipped when n would exceed the recursion limit
+    :return:
+    """
+    if ns is None:
+        ns = [300, 20000]
+    for n in ns:
+        runs = [("fib (loop)", lambda: fib(n))]
+        if 3 * n < sys.getrecursionlimit():
+            runs.append(("memoized, Memo", lambda: fib_step.memoized(n)))
+        runs += [("tabulated, Memo", lambda: fib_step(n, memo=Memo())),
+                 ("tabulated, ArrayMemo", lambda: fib_step(n, memo=ArrayMemo(n + 1))),
+                 ("tabulated, LRUMemo(2)", lambda: fib_step(n, memo=LRUMemo(2)))]
+        for name, function in runs:
+            _, elapsed, peak = measure(function)
+            print(f"n = {n:>6,}, {name:<22} time = {elapsed:.4f}s, peak memory = {peak / 2 ** 10:>10,.1f} KiB")
+        disk = DiskMemo()
+        _, elapsed, peak = measure(fib_step, n, memo=disk)
+        disk.close()
+        print(f"n = {n:>6,}, {'tabulated, DiskMemo':<22} time = {elapsed:.4f}s, peak memory = {peak / 2 ** 10:>10,.1f} KiB")
+
+
+def test_fib_fast_and_matrix():
+    for n in range(1, 300):
+        expected = fib(n)
+        assert fib_fast(n) == expected
+        assert fib_matrix(n) == expected
+        assert fib_fast(n, 97) == expected % 97
+        assert fib_matrix(n, 97) == expected % 97
+    assert fib_fast(0) == fib_matrix(0) == 0
+    assert fib_fast(0, 10) == fib_matrix(0, 10) == 0
+    assert fib_fast(5, 1) == fib_matrix(5, 1) == 0
+
+
+def test_pisano_period():
+    assert [pisano_period(m) for m in range(1, 11)] == [1, 3, 8, 6, 20, 24, 16, 12, 24, 60]
+    for mod in (2, 10, 1000, 10 ** 9 + 7):
+        for n in (0, 1, 7, 1234, 10 ** 15 + 3):
+            assert fib_mod(n, mod, pisano_limit=1000) == fib_fast(n, mod)
+
+
+def test_fib_dp_memo_backends():
+    assert [fib_dp(n) for n in range(10)] == [0, 1, 1, 2, 3, 5, 8, 13, 21, 34]
+    # Deep n, no recursion
+    assert fib_dp(20000) == fib_fast(20000)
+    memo = Memo()
+    assert fib_dp(100, memo) == fib_fast(100)
+    assert len(memo) == 101
+    misses = memo.misses
+    assert fib_dp(100, memo) == fib_fast(100)
+    assert memo.misses == misses
+    # Only F(101) to F(120) are computed
+    assert fib_dp(120, memo) == fib_fast(120)
+    assert len(memo) == 121
+    assert memo.misses == misses + 20
+    bounded = LRUMemo(10)
+    assert fib_dp(500, bounded) == fib_fast(500)
+    assert len(bounded) == 10
+    assert fib_dp(300, bounded) == fib_fast(300)
+    assert fib_dp(100, LRUMemo(2)) == fib_fast(100)
+    assert fib_dp(5000, LRUMemo(1)) == fib_fast(5000)
+    shared = ThreadSafeMemo(LRUMemo(1000))
+    assert fib_dp(50, shared) == fib_fast(50)
+    plain = {}
+    assert fib_dp(30, plain) == 832040 and plain[30] == 832040
+    array_memo = ArrayMemo(1001)
+    assert fib_dp(1000, array_memo) == fib_fast(1000)
+    disk = DiskMemo()
+    assert fib_dp(300, disk) == fib_fast(300)
+    disk.close()
+
+
+def test_fib_step_memoized():
+    assert [fib_step.memoized(n) for n in range(10)] == [0, 1, 1, 2, 3, 5, 8, 13, 21, 34]
+    assert fib_step.memoized(200) == fib_step.tabulated(200) == fib_fast(200)
+
+
+def test_fib_batch_exact():
+    ns = [10, 0, 3, 500, 10, 1, 100000, 70]
+    assert fib_batch(ns) == [fib_fast(n) for n in ns]
+    assert fib_batch([]) == []
+
+
+def test_fib_batch_mod():
+    rng = random.Random(3)
+    ns = [rng.randrange(10 ** 12) for _ in range(200)] + [0, 1, 2]
+    for mod in (1, 2, 1000, 10 ** 9 + 7, 2 ** 61 - 1):
+        result = fib_batch(ns, mod)
+        assert isinstance(result, list)
+        assert result == [fib_fast(n, mod) for n in ns]
+    assert fib_batch([], 7) == []
+    # Too large for int64, computed one by one
+    assert fib_batch([2 ** 63 + 5, 10], 10 ** 9 + 7) == [fib_fast(2 ** 63 + 5, 10 ** 9 + 7), 55]
+
+
 if __name__ == '__main__':
     # Iterative
     print(f"fib(5) = {fib(5)}")
@@ -66,5 +404,18 @@ if __name__ == '__main__':
     print(f"fib(7) = {fib_rec(7)}")
     print(f"fib(10) = {fib_rec(10)}")
     print(f"fib_dp(50) = {fib_dp(50)}")
+    memo = LRUMemo(1000)
+    fib_dp(5000, memo)
+    fib_dp(4000, memo)
+    print(memo)
     print(f"fib(35) = {fib_rec(35)}")
     # print(f"fib(50) = {fib(50)}")
+
+    # Fast doubling / matrix power
+    print(f"fib_fast(100) = {fib_fast(100)}")
+    print(f"fib_matrix(100) = {fib_matrix(100)}")
+    print(f"fib_mod(10^18, 10^9 + 7) = {fib_mod(10 ** 18, 10 ** 9 + 7)}")
+    print(f"fib_batch([10, 20, 30]) = {fib_batch([10, 20, 30])}")
+    # benchmark()
+    # benchmark_batch()
+    # benchmark_memo()
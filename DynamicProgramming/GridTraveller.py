@@ -6,16 +6,62 @@ Write a function which can return number of unique paths a traveller can take.
 Constraints:
     1. M > 0
     2. N > 0
+
+Every path is m - 1 moves down and n - 1 moves right in some order, so the answer is C(m + n - 2, m - 1):
+grid_paths and grid_paths_batch compute it directly, exactly or modulo 'mod'.
 """
-from typing import Dict, List
+import math
+import random
+import sys
+import time
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+from Memo import ArrayMemo, DiskMemo, LRUMemo, Memo, ThreadSafeMemo
+from Memoize import dynamic_programming, measure
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed by the vectorized path of grid_paths_batch
+    np = None
+
+# The vectorized modular path multiplies int64 values, each product must stay below 2^63
+NUMPY_MAX_MOD = 2 ** 31
 
 
-def grid_traveller(m: int, n: int, memo: List[List[int]] = None) -> int:
+def _grid_order(m: int, n: int):
     """
-    Recursive solution of the traveller problem
+    Bottom-up order of the subproblems: the upper triangle i <= j of the min(m, n) x max(m, n) grid, row by row
+    Every other cell shares the key of its transpose
+    """
+    rows, columns = min(m, n), max(m, n)
+    return ((i, j) for i in range(1, rows + 1) for j in range(i, columns + 1))
+
+
+@dynamic_programming(order=_grid_order, key=lambda m, n: (m, n) if m <= n else (n, m),
+                     window=lambda m, n: max(m, n) + 2)
+def grid_traveller_step(recurse, m: int, n: int) -> int:
+    """
+    Recursive definition of the traveller problem for the Memoize framework
+    The memo is keyed by (min(m, n), max(m, n)) since the problem is symmetric.
+    grid_traveller_step(m, n) tabulates half of the grid row by row, grid_traveller_step.memoized(m, n) recurses top-down
+    """
+    if m < 1 or n < 1:
+        return 0
+    if m == 1 or n == 1:
+        return 1
+    return recurse(m - 1, n) + recurse(m, n - 1)
+
+
+def grid_traveller(m: int, n: int, memo: Union[Memo, LRUMemo, ThreadSafeMemo, None] = None) -> int:
+    """
+    Dynamic programming solution of the traveller problem using memoization
+    The memo is keyed by (min(m, n), max(m, n)) since the problem is symmetric.
+    It is tabulated bottom-up by grid_traveller_step row by row (only cells with i <= j): a memoized cell is reused, any other cell
+    is the sum of the cell above and the cell on the left, so there is no recursion depth limit.
+    The last row is kept besides the memo, so a bounded memo of any capacity works.
     :param m:
     :param n:
-    :param memo: Memo object --> a 2-D array
+    :param memo: Memo backend (see Memo.py), a new Memo is used for this call only when None
     :return:
     """
     # Recursive solution with O(n^n) time complexity
@@ -25,21 +71,11 @@ def grid_traveller(m: int, n: int, memo: List[List[int]] = None) -> int:
     #     return 1
     #     return grid_traveller(m - 1, n) + grid_traveller(m, n - 1)
 
-    # Recursive solution with dynamic programming memoization
-    # Time complexity: O(m+n)
-    # Space complexity: O(m * n)
-    if not memo:
-        dim = max(m + 1, n + 1)
-        memo = [[None] * dim for _ in range(dim)]
-        for i in range(dim):
-            memo[i][0] = 0
-            memo[0][i] = 0
-        memo[1][1] = 1
-    if memo[m][n] is None:
-        max_path = grid_traveller(m - 1, n, memo) + grid_traveller(m, n - 1, memo)
-        memo[m][n] = max_path
-        memo[n][m] = max_path
-    return memo[m][n]
+    # Time complexity: O(m * n)
+    # Space complexity: O(m * n), or the capacity of a bounded memo plus one row
+    if m < 1 or n < 1:
+        return 0
+    return grid_traveller_step(m, n, memo=memo)
 
 
 def grid_traveller2(m: int, n: int) -> int:
@@ -70,6 +106,231 @@ def grid_traveller2(m: int, n: int) -> int:
     return matrix[m][n]
 
 
+def grid_paths(m: int, n: int, mod: Optional[int] = None) -> int:
+    """
+    Closed form of the traveller problem: C(m + n - 2, m - 1)
+    Exact mode uses math.comb. Modular mode multiplies the min(m, n) - 1 factors of the numerator and of
+    the denominator mod 'mod' and divides with one modular inverse.
+    Time Complexity = O(min(m, n)) multiplications
+    Space Complexity = O(1)
+    :param m:
+    :param n:
+    :param mod: Counts the paths mod 'mod' when given, (min(m, n) - 1)! must be invertible mod 'mod'
+                (e.g. a prime larger than min(m, n))
+    :return:
+    """
+    if m < 1 or n < 1:
+        return 0
+    total, k = m + n - 2, min(m, n) - 1
+    if not mod:
+        return math.comb(total, k)
+    numerator = denominator = 1
+    for i in range(k):
+        numerator = numerator * (total - i) % mod
+        denominator = denominator * (i + 1) % mod
+    return numerator * pow(denominator, -1, mod) % mod
+
+
+class FactorialTable:
+    """
+    Factorials and inverse factorials mod 'mod' of 0 to size, for O(1) binomial coefficients
+        comb(n, k) = n! * (k!)^-1 * ((n - k)!)^-1 mod 'mod'
+    Only one modular inverse is needed: inverse(i!) = inverse((i + 1)!) * (i + 1)
+    """
+
+    def __init__(self, size: int, mod: int):
+        """
+        :param size: Largest n of the queries
+        :param mod: size! must be invertible mod 'mod', i.e. every prime factor of mod is larger than size
+        """
+        self.size = size
+        self.mod = mod
+        factorials = [1] * (size + 1)
+        for i in range(1, size + 1):
+            factorials[i] = factorials[i - 1] * i % mod
+        inverses = [1] * (size + 1)
+        try:
+            inverses[size] = pow(factorials[size], -1, mod)
+        except ValueError:
+            raise ValueError(f"{size}! is not invertible mod {mod}, use a prime mod larger than {size}") from None
+        for i in range(size, 0, -1):
+            inverses[i - 1] = inverses[i] * i % mod
+        self.factorials = factorials
+        self.inverses = inverses
+
+    def comb(self, n: int, k: int) -> int:
+        if not 0 <= k <= n:
+            return 0
+        return self.factorials[n] * self.inverses[k] % self.mod * self.inverses[n - k] % self.mod
+
+
+def grid_paths_batch(queries: Union[Iterable[Tuple[int, int]], Sequence], mod: Optional[int] = None):
+    """
+    Counts the paths of every (m, n) grid of a batch
+    Exact mode: math.comb per query
+    Modular mode: one FactorialTable up to the largest m + n - 2, then O(1) per query, vectorized with
+        int64 NumPy arrays when NumPy is available and mod < 2^31
+    :param queries: (m, n) pairs, or an integer NumPy array of shape (k, 2)
+    :param mod: Counts the paths mod 'mod' when given, see FactorialTable
+    :return: List of the results (ints) in the order of the queries, in every mode
+    """
+    if not mod:
+        return [grid_paths(m, n) for m, n in queries]
+    if np is None or not isinstance(queries, np.ndarray):
+        queries = list(queries)
+    if np is not None and mod < NUMPY_MAX_MOD:
+        return _grid_paths_batch_numpy(np.asarray(queries, dtype=np.int64).reshape(-1, 2), mod).tolist()
+    # Grids without a cell have no path and do not size the table
+    table = FactorialTable(max((m + n - 2 for m, n in queries if m >= 1 and n >= 1), default=0), mod)
+    return [table.comb(m + n - 2, m - 1) if m >= 1 and n >= 1 else 0 for m, n in queries]
+
+
+def _grid_paths_batch_numpy(queries, mod: int):
+    if len(queries) == 0:
+        return np.zeros(0, dtype=np.int64)
+    ms, ns = queries[:, 0], queries[:, 1]
+    valid = (ms >= 1) & (ns >= 1)
+    # Invalid grids read the table at 0 and are zeroed at the end
+    downs = np.where(valid, ms - 1, 0)
+    rights = np.where(valid, ns - 1, 0)
+    table = FactorialTable(int((downs + rights).max()), mod)
+    factorials = np.array(table.factorials, dtype=np.int64)
+    inverses = np.array(table.inverses, dtype=np.int64)
+    paths = factorials[downs + rights] * inverses[downs] % mod * inverses[rights] % mod
+    return np.where(valid, paths, 0)
+
+
+def benchmark_closed_form(sizes: List[int] = None, batch_size: int = 1000000, mod: int = 10 ** 9 + 7) -> None:
+    """
+    Compares grid_traveller and grid_traveller2 with grid_paths on size x size grids (time and peak memory),
+    then grid_paths_batch on a batch of random grids up to 10^5 on a side, mod 10^9 + 7
+    grid_traveller2 is skipped above 1000, its dim x dim matrix of big integers grows quadratically
+    :return:
+    """
+    if sizes is None:
+        sizes = [100, 500, 1000, 10 ** 5]
+    for size in sizes:
+        runs = [("grid_traveller", lambda: grid_traveller(size, size)),
+                ("grid_traveller2", lambda: grid_traveller2(size, size))] if size <= 1000 else []
+        runs += [("grid_paths", lambda: grid_paths(size, size)),
+                 ("grid_paths mod", lambda: grid_paths(size, size, mod))]
+        for name, function in runs:
+            _, elapsed, peak = measure(function)
+            print(f"grid = {size:>7,}, {name:<16} time = {elapsed:.4f}s, peak memory = {peak / 2 ** 20:>8,.2f} MiB")
+    rng = random.Random(5)
+    queries = [(rng.randint(1, 10 ** 5), rng.randint(1, 10 ** 5)) for _ in range(batch_size)]
+    start = time.perf_counter()
+    grid_paths_batch(queries, mod)
+    elapsed = time.perf_counter() - start
+    print(f"mod, batch = {batch_size:,}: grid_paths_batch = {batch_size / elapsed:,.0f} queries/sec")
+    sample = queries[:1000]
+    start = time.perf_counter()
+    for m, n in sample:
+        grid_paths(m, n, mod)
+    elapsed = time.perf_counter() - start
+    print(f"mod, one grid_paths call per query = {len(sample) / elapsed:,.0f} queries/sec")
+
+
+def benchmark(sizes: List[int] = None) -> None:
+    """
+    Time and peak memory of grid_traveller_step memoized top-down and tabulated onto each memo backend,
+    against grid_traveller2, on size x size grids
+    Top-down is skipped when the grid would exceed the recursion limit
+    :return:
+    """
+    if sizes is None:
+        sizes = [200, 500]
+    for size in sizes:
+        runs = [("grid_traveller2", lambda: grid_traveller2(size, size))]
+        if 4 * size < sys.getrecursionlimit():
+            runs.append(("memoized, Memo", lambda: grid_traveller_step.memoized(size, size)))
+        runs += [("tabulated, Memo", lambda: grid_traveller_step(size, size, memo=Memo())),
+                 ("tabulated, ArrayMemo", lambda: grid_traveller_step(size, size, memo=ArrayMemo((size + 1, size + 1)))),
+                 ("tabulated, LRUMemo", lambda: grid_traveller_step(size, size, memo=LRUMemo(size)))]
+        for name, function in runs:
+            _, elapsed, peak = measure(function)
+            print(f"grid = {size:>5,}, {name:<21} time = {elapsed:.3f}s, peak memory = {peak / 2 ** 20:>8,.2f} MiB")
+        disk = DiskMemo()
+        _, elapsed, peak = measure(grid_traveller_step, size, size, memo=disk)
+        disk.close()
+        print(f"grid = {size:>5,}, {'tabulated, DiskMemo':<21} time = {elapsed:.3f}s, peak memory = {peak / 2 ** 20:>8,.2f} MiB")
+
+
+def test_grid_traveller():
+    for m in range(1, 8):
+        for n in range(1, 8):
+            assert grid_traveller(m, n) == grid_traveller2(m, n)
+    assert grid_traveller(0, 5) == 0
+    assert grid_traveller(1, 1) == 1
+
+
+def test_grid_traveller_memo_backends():
+    memo = Memo()
+    assert grid_traveller(18, 18, memo) == 2333606220
+    assert grid_traveller(10, 12, memo) == grid_traveller(12, 10) == grid_traveller2(12, 10)
+    assert memo.hits >= 1
+    bounded = LRUMemo(50)
+    assert grid_traveller(30, 40, bounded) == grid_traveller2(30, 40)
+    assert len(bounded) == 50
+    assert grid_traveller(100, 100, LRUMemo(50)) == grid_traveller2(100, 100)
+    shared = ThreadSafeMemo()
+    assert grid_traveller(5, 5, shared) == 70
+    assert grid_traveller(20, 30, ArrayMemo((31, 31))) == grid_traveller2(20, 30)
+    disk = DiskMemo()
+    assert grid_traveller(12, 9, disk) == grid_traveller2(12, 9)
+    disk.close()
+    assert grid_traveller_step.memoized(15, 20) == grid_traveller2(15, 20)
+    # Deep grids do not hit the recursion limit
+    assert grid_traveller(2, 5000) == 5000
+
+
+def test_grid_paths():
+    for m in range(1, 12):
+        for n in range(1, 12):
+            assert grid_paths(m, n) == grid_traveller2(m, n)
+            assert grid_paths(m, n, 97) == grid_paths(m, n) % 97
+    assert grid_paths(0, 5) == grid_paths(5, 0, 97) == 0
+    assert grid_paths(18, 18) == 2333606220
+    assert grid_paths(10 ** 5, 10 ** 5, 10 ** 9 + 7) == math.comb(2 * 10 ** 5 - 2, 10 ** 5 - 1) % (10 ** 9 + 7)
+    try:
+        grid_paths(10, 10, 7)
+        assert False, "ValueError expected"
+    except ValueError:
+        pass
+
+
+def test_factorial_table():
+    table = FactorialTable(50, 101)
+    for n in range(51):
+        for k in range(-1, n + 2):
+            assert table.comb(n, k) == (math.comb(n, k) % 101 if 0 <= k <= n else 0)
+    try:
+        FactorialTable(10, 7)
+        assert False, "ValueError expected"
+    except ValueError:
+        pass
+
+
+def test_grid_paths_batch():
+    rng = random.Random(4)
+    queries = [(rng.randint(1, 300), rng.randint(1, 300)) for _ in range(500)] + [(1, 1), (0, 3), (4, 0)]
+    assert grid_paths_batch(queries) == [grid_paths(m, n) for m, n in queries]
+    for mod in (10 ** 9 + 7, 2 ** 61 - 1, 1009):
+        result = grid_paths_batch(queries, mod)
+        assert isinstance(result, list)
+        assert result == [grid_paths(m, n, mod) for m, n in queries]
+        # Generators are accepted by every mode
+        assert grid_paths_batch(((m, n) for m, n in queries), mod) == result
+    assert grid_paths_batch(((m, n) for m, n in queries)) == grid_paths_batch(queries)
+    if np is not None:
+        assert grid_paths_batch(np.array(queries), 10 ** 9 + 7) == grid_paths_batch(queries, 10 ** 9 + 7)
+    assert grid_paths_batch([], 13) == []
+    # Only grids without a cell, on the vectorized and the pure Python path
+    for mod in (10 ** 9 + 7, 2 ** 61 - 1):
+        assert grid_paths_batch([(0, 0), (0, 1), (-2, 5)], mod) == [0, 0, 0]
+    assert grid_paths_batch([]) == []
+
+
 if __name__ == '__main__':
     # Iterative
     print(f"Grid Traveller Problem")
@@ -83,4 +344,11 @@ if __name__ == '__main__':
     print(f"grid_traveller2(5, 5): {grid_traveller2(5, 5)}")
 
     print(f"grid_traveller(18, 18): {grid_traveller(18, 18)}")
+    memo = LRUMemo(10000)
+    print(f"grid_traveller(200, 300): {grid_traveller(200, 300, memo)}")
+    print(memo)
+    print(f"grid_paths(10^5, 10^5) mod 10^9 + 7: {grid_paths(10 ** 5, 10 ** 5, 10 ** 9 + 7)}")
+    print(f"grid_paths_batch([(2, 3), (3, 3), (18, 18)]): {grid_paths_batch([(2, 3), (3, 3), (18, 18)])}")
+    # benchmark()
+    # benchmark_closed_form()
     # print(f"grid_traveller2(18, 18): {grid_traveller2(18, 18)}")
@@ -0,0 +1,316 @@
+"""
+Memo backends for the Dynamic Programming functions
+    1. Memo: unbounded dict, a new one per call by default
+    2. LRUMemo: keeps at most 'capacity' entries, least recently used ones are evicted
+    3. ThreadSafeMemo: wraps another backend behind a lock so that it can be shared by threads
+    4. ArrayMemo: preallocated list indexed by integer keys (or tuples of integers), no hashing
+    5. DiskMemo: on-disk store (shelve), results survive the process and do not use memory
+Every backend counts its hits and misses and can report an estimate of the memory it holds.
+get returns 'default' (None unless given) on a miss, pass a sentinel to memoize None values.
+"""
+import os
+import shelve
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+
+# Marks a missing value, so that None can be memoized
+_MISSING = object()
+
+
+class Memo:
+    """
+    Unbounded memo on top of a dict
+    """
+
+    def __init__(self, store: Optional[Dict] = None):
+        """
+        :param store: Existing dict to use as the memo, e.g. to keep results across calls
+        """
+        self.store: Dict = store if store is not None else dict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self.store
+
+    def __str__(self):
+        return (f"{type(self).__name__}: entries = {len(self)}, hits = {self.hits}, misses = {self.misses}, "
+                f"memory = {self.memory_bytes():,} bytes")
+
+    def get(self, key: Any, default: Any = None) -> Optional[Any]:
+        """
+        :return: Memoized value or default on a miss
+        """
+        value = self.store.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        self.store[key] = value
+
+    def clear(self) -> None:
+        self.store.clear()
+
+    def memory_bytes(self) -> int:
+        """
+        Estimate of the memory held: the container plus every key and value (sys.getsizeof)
+        Time Complexity = O(n)
+        :return:
+        """
+        return sys.getsizeof(self.store) + sum(sys.getsizeof(key) + sys.getsizeof(value)
+                                               for key, value in list(self.store.items()))
+
+
+class LRUMemo(Memo):
+    """
+    Bounded memo, evicts the least recently used entry once 'capacity' entries are stored
+    """
+
+    def __init__(self, capacity: int):
+        super().__init__(OrderedDict())
+        self.capacity = capacity
+
+    def get(self, key: Any, default: Any = None) -> Optional[Any]:
+        try:
+            self.store.move_to_end(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return self.store[key]
+
+    def put(self, key: Any, value: Any) -> None:
+        store = self.store
+        if key in store:
+            store.move_to_end(key)
+        elif len(store) >= self.capacity:
+            store.popitem(last=False)
+        store[key] = value
+
+
+class ThreadSafeMemo:
+    """
+    Wraps a backend behind a lock so that one memo can be shared by all the threads
+    Same methods as Memo, hits and misses are counted by the wrapped backend
+    """
+
+    def __init__(self, memo: Optional[Memo] = None):
+        self.memo = memo if memo is not None else Memo()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.memo)
+
+    def __contains__(self, key: Any) -> bool:
+        with self.lock:
+            return key in self.memo
+
+    def __str__(self):
+        with self.lock:
+            return f"{type(self).__name__}({self.memo})"
+
+    @property
+    def hits(self) -> int:
+        return self.memo.hits
+
+    @property
+    def misses(self) -> int:
+        return self.memo.misses
+
+    def get(self, key: Any, default: Any = None) -> Optional[Any]:
+        with self.lock:
+            return self.memo.get(key, default)
+
+    def put(self, key: Any, value: Any) -> None:
+        with self.lock:
+            self.memo.put(key, value)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.memo.clear()
+
+    def memory_bytes(self) -> int:
+        with self.lock:
+            return self.memo.memory_bytes()
+
+
+class ArrayMemo(Memo):
+    """
+    Memo in a preallocated list, for keys which are integers in range(shape)
+    or tuples of integers in the ranges of a multidimensional shape (stored row major)
+    """
+
+    def __init__(self, shape: Union[int, Tuple[int, ...]]):
+        super().__init__()
+        self.shape: Tuple[int, ...] = (shape,) if isinstance(shape, int) else tuple(shape)
+        total = 1
+        for dimension in self.shape:
+            total *= dimension
+        self.store: list = [_MISSING] * total
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, key: Any) -> bool:
+        return self.store[self._index(key)] is not _MISSING
+
+    def _index(self, key: Any) -> int:
+        if isinstance(key, int):
+            if not 0 <= key < len(self.store):
+                raise IndexError(f"key {key} out of the memo shape {self.shape}")
+            return key
+        index = 0
+        for value, dimension in zip(key, self.shape):
+            if not 0 <= value < dimension:
+                raise IndexError(f"key {key} out of the memo shape {self.shape}")
+            index = index * dimension + value
+        return index
+
+    def get(self, key: Any, default: Any = None) -> Optional[Any]:
+        value = self.store[self._index(key)]
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        index = self._index(key)
+        if self.store[index] is _MISSING:
+            self.count += 1
+        self.store[index] = value
+
+    def clear(self) -> None:
+        self.store = [_MISSING] * len(self.store)
+        self.count = 0
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self.store) + sum(sys.getsizeof(value) for value in self.store if value is not _MISSING)
+
+
+class DiskMemo(Memo):
+    """
+    Memo stored on disk with shelve, keys are stored by their repr
+    A temporary file is used when no path is given. Call close() when done.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__()
+        if path is None:
+            path = os.path.join(tempfile.mkdtemp(), "memo")
+        self.path = path
+        self.store = shelve.open(path)
+
+    def __contains__(self, key: Any) -> bool:
+        return repr(key) in self.store
+
+    def get(self, key: Any, default: Any = None) -> Optional[Any]:
+        try:
+            value = self.store[repr(key)]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        self.store[repr(key)] = value
+
+    def close(self) -> None:
+        self.store.close()
+
+    def memory_bytes(self) -> int:
+        """
+        Values live on disk, nothing is held in memory
+        :return:
+        """
+        return 0
+
+
+def test_memo_hits_and_misses():
+    memo = Memo()
+    assert memo.get(1) is None
+    memo.put(1, "one")
+    assert memo.get(1) == "one"
+    assert (memo.hits, memo.misses, len(memo)) == (1, 1, 1)
+    assert memo.memory_bytes() > 0
+    # None can be memoized, a sentinel default tells it from a miss
+    missing = object()
+    memo.put(2, None)
+    assert memo.get(2, missing) is None
+    assert memo.get(3, missing) is missing
+    for backend in (LRUMemo(4), ArrayMemo(4), ThreadSafeMemo(), DiskMemo()):
+        backend.put(2, None)
+        assert backend.get(2, missing) is None and backend.get(3, missing) is missing
+        assert (backend.hits, backend.misses) == (1, 1)
+        if isinstance(backend, DiskMemo):
+            backend.close()
+
+
+def test_lru_memo_is_bounded():
+    memo = LRUMemo(2)
+    memo.put(1, 1)
+    memo.put(2, 2)
+    assert memo.get(1) == 1
+    memo.put(3, 3)
+    assert 2 not in memo
+    assert memo.get(2) is None
+    assert len(memo) == 2
+
+
+def test_array_memo():
+    memo = ArrayMemo((3, 4))
+    assert memo.get((2, 3)) is None
+    memo.put((2, 3), 23)
+    memo.put((0, 1), 1)
+    memo.put((2, 3), 24)
+    assert memo.get((2, 3)) == 24
+    assert (2, 3) in memo and (1, 1) not in memo
+    assert len(memo) == 2
+    flat = ArrayMemo(10)
+    flat.put(9, "nine")
+    assert flat.get(9) == "nine"
+    try:
+        flat.put(10, "ten")
+        assert False, "IndexError expected"
+    except IndexError:
+        pass
+
+
+def test_disk_memo():
+    memo = DiskMemo()
+    memo.put((1, 2), 12)
+    assert memo.get((1, 2)) == 12
+    assert memo.get((2, 1)) is None
+    assert (memo.hits, memo.misses, len(memo)) == (1, 1, 1)
+    memo.close()
+    reopened = DiskMemo(memo.path)
+    assert reopened.get((1, 2)) == 12
+    reopened.close()
+
+
+def test_thread_safe_memo():
+    memo = ThreadSafeMemo(LRUMemo(1000))
+
+    def worker(offset: int) -> None:
+        for key in range(offset, offset + 500):
+            memo.put(key, key)
+            memo.get(key)
+
+    threads = [threading.Thread(target=worker, args=(i * 250,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(memo) <= 1000
+    assert memo.hits + memo.misses == 2000
@@ -0,0 +1,218 @@
+"""
+Memoization and tabulation decorator for Dynamic Programming problems
+The recursive definition is written once, with the function to recurse through as first parameter:
+
+    @dynamic_programming(order=lambda n: ((i,) for i in range(2, n)))
+    def fib(recurse, n):
+        if n <= 1:
+            return n
+        return recurse(n - 1) + recurse(n - 2)
+
+and can then be evaluated two ways, onto any memo backend of Memo.py (dict, LRU, array, disk, thread safe):
+    1. fib.memoized(n, memo=...): top-down, only the subproblems which are needed are solved,
+       recursion depth grows with the problem
+    2. fib.tabulated(n, memo=...): bottom-up, the subproblems are solved in the given order so that every
+       recursive call finds its result memoized, the recursion depth stays 1 whatever the problem size
+Calling fib(n, memo=...) tabulates when an order was given and memoizes otherwise.
+Tabulation keeps the last 'window' computed values on the side, independently of the memo, so that a bounded
+memo (LRUMemo) of any capacity never makes it recompute an evicted subproblem recursively.
+"""
+import functools
+import time
+import tracemalloc
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from Memo import LRUMemo, Memo
+
+# Marks a missing value, so that subproblems whose result is None are memoized too
+_MISSING = object()
+
+
+class DPFunction:
+    """
+    Recursive definition of a Dynamic Programming problem, see dynamic_programming
+    """
+
+    def __init__(self, step: Callable[..., Any], order: Optional[Callable[..., Iterable[Tuple]]] = None,
+                 key: Optional[Callable[..., Any]] = None, window: Optional[Callable[..., int]] = None):
+        """
+        :param step: step(recurse, *args) computes the result of args from recurse(*smaller_args)
+        :param order: order(*args) yields the argument tuples of the subproblems of args, every subproblem
+                      after the ones it depends on. Needed by tabulated.
+        :param key: key(*args) is the memo key of args, by default the argument itself or the tuple of arguments
+        :param window: window(*args) is the number of most recently computed values tabulated keeps besides
+                       the memo, enough for every subproblem to find its dependencies there, e.g. 3 for fibonacci
+        """
+        self.step = step
+        self.order = order
+        self.key = key
+        self.window = window
+        functools.update_wrapper(self, step)
+
+    def __call__(self, *args: Any, memo: Optional[Memo] = None) -> Any:
+        if self.order is not None:
+            return self.tabulated(*args, memo=memo)
+        return self.memoized(*args, memo=memo)
+
+    def _recurse(self, memo: Memo, window: int = 0) -> Callable[..., Any]:
+        """
+        Returns the memoized recursive function handed to step
+        :param window: Number of most recently computed values looked up before the memo, 0 for none
+        """
+        step, key = self.step, self.key
+        recent: Dict[Any, Any] = dict()
+        recent_keys: deque = deque()
+
+        def recurse(*args: Any) -> Any:
+            memo_key = key(*args) if key else (args[0] if len(args) == 1 else args)
+            value = recent.get(memo_key, _MISSING)
+            if value is not _MISSING:
+                return value
+            value = memo.get(memo_key, _MISSING)
+            if value is _MISSING:
+                value = step(recurse, *args)
+                memo.put(memo_key, value)
+            if window:
+                recent[memo_key] = value
+                recent_keys.append(memo_key)
+                if len(recent_keys) > window:
+                    del recent[recent_keys.popleft()]
+            return value
+
+        return recurse
+
+    def memoized(self, *args: Any, memo: Optional[Memo] = None) -> Any:
+        """
+        Top-down evaluation, limited by the recursion depth
+        :param memo: Memo backend, a new Memo is used for this call only when None
+        :return:
+        """
+        return self._recurse(memo if memo is not None else Memo())(*args)
+
+    def tabulated(self, *args: Any, memo: Optional[Memo] = None) -> Any:
+        """
+        Bottom-up evaluation: every subproblem of the order is solved before args
+        :param memo: Memo backend, a new Memo is used for this call only when None
+        :return:
+        """
+        if self.order is None:
+            raise TypeError(f"{self.__name__} has no evaluation order, it can only be memoized")
+        window = self.window(*args) if self.window else 0
+        recurse = self._recurse(memo if memo is not None else Memo(), window)
+        for sub_args in self.order(*args):
+            recurse(*sub_args)
+        return recurse(*args)
+
+
+def dynamic_programming(order: Optional[Callable[..., Iterable[Tuple]]] = None,
+                        key: Optional[Callable[..., Any]] = None,
+                        window: Optional[Callable[..., int]] = None) -> Callable[[Callable[..., Any]], DPFunction]:
+    """
+    Decorator turning a pure recursive step(recurse, *args) into a DPFunction
+    :param order: Bottom-up order of the subproblems of args, see DPFunction
+    :param key: Memo key of the arguments, e.g. to share the results of symmetric arguments
+    :param window: Number of recent values kept while tabulating, see DPFunction
+    :return:
+    """
+    def decorator(step: Callable[..., Any]) -> DPFunction:
+        return DPFunction(step, order, key, window)
+
+    return decorator
+
+
+def measure(function: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, float, int]:
+    """
+    Runs function once, used by the benchmarks of the DP problems
+    :return: result, elapsed seconds and peak memory allocated during the call (tracemalloc) in bytes
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = function(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def test_memoized_and_tabulated():
+    calls = []
+
+    @dynamic_programming(order=lambda n: ((i,) for i in range(n)))
+    def triangle(recurse, n):
+        calls.append(n)
+        return 0 if n == 0 else n + recurse(n - 1)
+
+    assert triangle.memoized(10) == triangle.tabulated(10) == triangle(10) == 55
+    assert triangle.__name__ == "triangle"
+    calls.clear()
+    memo = Memo()
+    assert triangle(100, memo=memo) == 5050
+    assert calls == list(range(101))
+    assert len(memo) == 101
+    # Everything is memoized now
+    assert triangle(50, memo=memo) == 1275
+    assert len(calls) == 101
+    # Tabulation has no recursion depth limit
+    assert triangle(100000) == 100000 * 100001 // 2
+
+
+def test_key_and_no_order():
+    @dynamic_programming(key=lambda a, b: (min(a, b), max(a, b)))
+    def binomial(recurse, a, b):
+        # Number of ways to choose a among a + b
+        if a == 0 or b == 0:
+            return 1
+        return recurse(a - 1, b) + recurse(a, b - 1)
+
+    memo = Memo()
+    assert binomial(10, 5, memo=memo) == 3003
+    assert binomial(5, 10, memo=memo) == 3003
+    assert memo.hits >= 1
+    assert all(a <= b for a, b in memo.store)
+    try:
+        binomial.tabulated(1, 2)
+        assert False, "TypeError expected"
+    except TypeError:
+        pass
+
+
+def test_window_with_bounded_memo():
+    calls = []
+
+    @dynamic_programming(order=lambda n: ((i,) for i in range(2, n)), window=lambda n: 3)
+    def fibonacci(recurse, n):
+        calls.append(n)
+        return n if n <= 1 else recurse(n - 1) + recurse(n - 2)
+
+    # The memo keeps a single entry, every dependency still comes from the window
+    assert fibonacci(60, memo=LRUMemo(1)) == 1548008755920
+    assert sorted(calls) == list(range(61))
+
+
+def test_none_results_are_memoized():
+    calls = []
+
+    @dynamic_programming(order=lambda n: ((i,) for i in range(n)), window=lambda n: 2)
+    def first_even(recurse, n):
+        # None until an even n is reached
+        calls.append(n)
+        if n == 0:
+            return None
+        previous = recurse(n - 1)
+        return previous if previous is not None else (n if n % 2 == 0 else None)
+
+    memo = Memo()
+    assert first_even(5, memo=memo) == 2
+    assert calls == list(range(6))
+    assert first_even.memoized(5, memo=memo) == 2
+    assert len(calls) == 6
+
+
+def test_measure():
+    result, elapsed, peak = measure(lambda size: [0] * size, 100000)
+    assert len(result) == 100000
+    assert elapsed >= 0
+    assert peak >= 8 * 100000
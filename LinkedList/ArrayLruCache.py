@@ -0,0 +1,207 @@
+import random
+import tracemalloc
+from array import array
+from typing import Any, Callable, List
+
+from LruCache import LRUCache, LRUCacheBasic
+
+NIL = -1
+
+
+class ArrayLRUCache:
+    """
+    An implementation of the LRU Cache without per-entry Node objects
+    Every entry lives in a slot, an index into preallocated parallel arrays:
+        keys[slot], values[slot] -> the entry itself
+        next[slot], prev[slot]   -> recency links as slot indices (NIL = no link)
+    Slots released by 'delete' are chained through the 'next' array into a free-list and reused by 'put'.
+    'get' and 'put' both operations are performed in O(1) time
+    """
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.keys: List[Any] = [None] * capacity
+        self.values: List[Any] = [None] * capacity
+        self.next = array("q", [NIL]) * capacity
+        self.prev = array("q", [NIL]) * capacity
+        self.head = NIL
+        self.tail = NIL
+        self.map = dict()
+        self.size = 0
+        # Slots never used so far are handed out in order, released slots go to the free-list
+        self.free = NIL
+        self.next_unused = 0
+
+    def __str__(self):
+        str_rep = "HEAD <-> "
+        current = self.head
+        while current != NIL:
+            str_rep += f"{self.keys[current]}: {self.values[current]} <-> "
+            current = self.next[current]
+        str_rep += "TAIL"
+        return str_rep
+
+    def _insert_first(self, slot: int) -> None:
+        self.prev[slot] = NIL
+        self.next[slot] = self.head
+        if self.head != NIL:
+            self.prev[self.head] = slot
+        else:
+            self.tail = slot
+        self.head = slot
+
+    def _delete_slot(self, slot: int) -> None:
+        """
+        Unlinks a slot from the recency list
+        :return:
+        """
+        prev_slot = self.prev[slot]
+        next_slot = self.next[slot]
+        if prev_slot != NIL:
+            self.next[prev_slot] = next_slot
+        else:
+            self.head = next_slot
+        if next_slot != NIL:
+            self.prev[next_slot] = prev_slot
+        else:
+            self.tail = prev_slot
+
+    def _allocate(self) -> int:
+        if self.free != NIL:
+            slot = self.free
+            self.free = self.next[slot]
+            return slot
+        slot = self.next_unused
+        self.next_unused += 1
+        return slot
+
+    def _release(self, slot: int) -> None:
+        self.keys[slot] = None
+        self.values[slot] = None
+        self.prev[slot] = NIL
+        self.next[slot] = self.free
+        self.free = slot
+
+    def get(self, key: Any) -> Any:
+        slot = self.map.get(key, NIL)
+        if slot == NIL:
+            return -1
+        if slot != self.head:
+            self._delete_slot(slot)
+            self._insert_first(slot)
+        return self.values[slot]
+
+    def put(self, key: Any, value: Any) -> None:
+        slot = self.map.get(key, NIL)
+        if slot != NIL:
+            # If the key already present then update the value and put the item at the front
+            if slot != self.head:
+                self._delete_slot(slot)
+                self._insert_first(slot)
+            self.values[slot] = value
+            return
+        if self.size == self.capacity:
+            # Reuse the slot on tail for the new entry
+            slot = self.tail
+            self._delete_slot(slot)
+            del self.map[self.keys[slot]]
+            self.size -= 1
+        else:
+            slot = self._allocate()
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.map[key] = slot
+        self._insert_first(slot)
+        self.size += 1
+
+    def delete(self, key: Any) -> bool:
+        """
+        Removes the key from the cache and returns its slot to the free-list
+        :return: True if the key was present
+        """
+        slot = self.map.pop(key, NIL)
+        if slot == NIL:
+            return False
+        self._delete_slot(slot)
+        self._release(slot)
+        self.size -= 1
+        return True
+
+
+def benchmark_memory(entries: int = 1000000) -> None:
+    """
+    Measures the memory held by each LRU engine once filled with 'entries' int -> int items using tracemalloc
+    Keys and values are created inside the measurement for every engine, so the numbers are comparable
+    WARNING: LRUCacheBasic eviction is O(n), the cache is filled without evictions to keep it fast
+    :return:
+    """
+    factories: List[Callable] = [LRUCache, LRUCacheBasic, ArrayLRUCache]
+    for factory in factories:
+        tracemalloc.start()
+        cache = factory(entries)
+        for i in range(entries):
+            cache.put(i, i)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{factory.__name__:<14} entries = {entries:,}, "
+              f"memory = {current / 2 ** 20:,.1f} MiB ({current / entries:,.0f} bytes/entry), "
+              f"peak = {peak / 2 ** 20:,.1f} MiB")
+        del cache
+
+
+def test_array_lru_cache_eviction_order():
+    cache = ArrayLRUCache(2)
+    cache.put(1, 1)
+    cache.put(2, 2)
+    assert cache.get(1) == 1
+    cache.put(3, 3)
+    assert cache.get(2) == -1
+    assert cache.get(1) == 1
+    assert cache.get(3) == 3
+    assert str(cache) == "HEAD <-> 3: 3 <-> 1: 1 <-> TAIL"
+
+
+def test_array_lru_cache_update_existing():
+    cache = ArrayLRUCache(2)
+    cache.put(1, 1)
+    cache.put(2, 2)
+    cache.put(1, 10)
+    cache.put(3, 3)
+    assert cache.get(1) == 10
+    assert cache.get(2) == -1
+    assert cache.size == 2
+
+
+def test_array_lru_cache_free_list_reuse():
+    cache = ArrayLRUCache(3)
+    cache.put(1, 1)
+    cache.put(2, 2)
+    cache.put(3, 3)
+    slot = cache.map[2]
+    assert cache.delete(2)
+    assert not cache.delete(2)
+    cache.put(4, 4)
+    assert cache.map[4] == slot
+    assert cache.size == 3
+    assert str(cache) == "HEAD <-> 4: 4 <-> 3: 3 <-> 1: 1 <-> TAIL"
+
+
+def test_array_lru_cache_matches_lru_cache():
+    rng = random.Random(11)
+    for capacity in range(1, 6):
+        array_lru = ArrayLRUCache(capacity)
+        lru = LRUCache(capacity)
+        for _ in range(2000):
+            key = rng.randrange(12)
+            if rng.random() < 0.5:
+                array_lru.put(key, key * 3)
+                lru.put(key, key * 3)
+            else:
+                assert array_lru.get(key) == lru.get(key)
+        assert array_lru.size == lru.size
+
+
+if __name__ == "__main__":
+    print("LRU Cache Implementation - array backed")
+    benchmark_memory()
@@ -0,0 +1,171 @@
+"""
+Asyncio wrapper around LRUCache with request coalescing (single-flight loading)
+
+When a key misses, only the first coroutine runs the loader. Every other coroutine asking for
+the same key meanwhile awaits the same in-flight future instead of computing the value again.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from LruCache import LRUCache
+
+Loader = Callable[[Any], Awaitable[Any]]
+
+
+class AsyncLRUCache:
+    """
+    Asyncio cache with single-flight loading on top of LRUCache
+    Everything runs on one event loop thread, so the LRUCache needs no locking.
+    With refresh_ahead set (and a ttl), a hit on an entry within refresh_ahead seconds of its expiry
+    returns the current value and reloads the entry in a background task.
+    """
+    def __init__(self, capacity: int, ttl: Optional[float] = None, refresh_ahead: Optional[float] = None):
+        self.cache = LRUCache(capacity, ttl=ttl)
+        self.refresh_ahead = refresh_ahead
+        self.in_flight: Dict[Any, asyncio.Future] = dict()
+        # The event loop only keeps weak references to tasks, hold them until they finish
+        self.tasks: Set[asyncio.Task] = set()
+
+    def get(self, key: Any) -> Any:
+        return self.cache.get(key)
+
+    def put(self, key: Any, value: Any) -> None:
+        self.cache.put(key, value)
+
+    async def get_or_load(self, key: Any, loader: Loader) -> Any:
+        """
+        Returns the cached value, or awaits loader(key) once for all concurrent callers on a miss
+        If the loader raises, every waiting caller gets the exception and nothing is cached
+        :return:
+        """
+        node = self.cache.map.get(key)
+        if node is not None:
+            value = self.cache.get(key)
+            if key in self.cache.map:
+                # Still there, i.e. not expired by the lookup
+                self._maybe_refresh(key, node.expires_at, loader)
+                return value
+        future = self.in_flight.get(key)
+        if future is None:
+            future = self._load(key, loader)
+        # shield: a cancelled caller must not cancel the load the other callers are waiting on
+        return await asyncio.shield(future)
+
+    def _load(self, key: Any, loader: Loader) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+
+        async def run() -> None:
+            try:
+                value = await loader(key)
+            except Exception as error:
+                future.set_exception(error)
+                # The exception is delivered to the waiters, do not report it as never retrieved
+                future.exception()
+            except BaseException:
+                future.cancel()
+                raise
+            else:
+                self.cache.put(key, value)
+                future.set_result(value)
+            finally:
+                self.in_flight.pop(key, None)
+
+        task = asyncio.ensure_future(run())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return future
+
+    def _maybe_refresh(self, key: Any, expires_at: Optional[float], loader: Loader) -> None:
+        if self.refresh_ahead is None or expires_at is None or key in self.in_flight:
+            return
+        if expires_at - self.cache.clock() <= self.refresh_ahead:
+            self._load(key, loader)
+
+
+def test_get_or_load_coalesces_concurrent_misses():
+    calls = []
+
+    async def loader(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key * 2
+
+    async def main():
+        cache = AsyncLRUCache(10)
+        results = await asyncio.gather(*[cache.get_or_load(21, loader) for _ in range(50)])
+        assert results == [42] * 50
+        assert await cache.get_or_load(21, loader) == 42
+        assert cache.get(21) == 42
+        assert not cache.in_flight
+
+    asyncio.run(main())
+    assert calls == [21]
+
+
+def test_get_or_load_propagates_loader_exception():
+    calls = []
+
+    async def loader(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        raise KeyError(key)
+
+    async def main():
+        cache = AsyncLRUCache(10)
+        results = await asyncio.gather(*[cache.get_or_load(1, loader) for _ in range(5)], return_exceptions=True)
+        assert all(isinstance(result, KeyError) for result in results)
+        assert cache.get(1) == -1
+        assert not cache.in_flight
+        # A later call retries the loader
+        await asyncio.gather(cache.get_or_load(1, loader), return_exceptions=True)
+
+    asyncio.run(main())
+    assert calls == [1, 1]
+
+
+def test_get_or_load_cancelled_waiter_does_not_cancel_load():
+    async def loader(key):
+        await asyncio.sleep(0.02)
+        return key
+
+    async def main():
+        cache = AsyncLRUCache(10)
+        first = asyncio.ensure_future(cache.get_or_load(7, loader))
+        second = asyncio.ensure_future(cache.get_or_load(7, loader))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        assert await second == 7
+        assert cache.get(7) == 7
+
+    asyncio.run(main())
+
+
+def test_get_or_load_refresh_ahead():
+    now = [0.0]
+    versions = []
+
+    async def loader(key):
+        versions.append(len(versions))
+        return versions[-1]
+
+    async def main():
+        cache = AsyncLRUCache(10, ttl=10, refresh_ahead=2)
+        cache.cache.clock = lambda: now[0]
+        assert await cache.get_or_load("k", loader) == 0
+        now[0] = 5.0
+        assert await cache.get_or_load("k", loader) == 0
+        now[0] = 9.0
+        # Close to expiry: old value is served, a reload runs in the background
+        assert await cache.get_or_load("k", loader) == 0
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert cache.get("k") == 1
+        now[0] = 20.0
+        assert await cache.get_or_load("k", loader) == 2
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    print("Asyncio LRU Cache with single-flight loading")
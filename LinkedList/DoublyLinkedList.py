@@ -1,10 +1,16 @@
-from typing import Any, Optional
+import time
+import tracemalloc
+from collections import deque
+from typing import Any, Iterable, Iterator, Optional
 
 
 class Node:
     """
     Node for a doubly linked list
+    Slotted: no per-node __dict__
     """
+    __slots__ = ("data", "next", "prev")
+
     def __init__(self, data):
         self.data = data
         self.next = None
@@ -14,19 +20,53 @@ class Node:
 class DoublyLinkedList:
     """
     An implementation of a doubly linked list
+    The length is tracked on every operation. split_at without a known length leaves it unknown (None)
+    so that the split stays O(1), it is then counted once by the next len().
     """
     def __init__(self):
         self.head: Node = None
         self.tail: Node = None
+        self._length: Optional[int] = 0
+
+    @property
+    def length(self) -> int:
+        if self._length is None:
+            count = 0
+            current = self.head
+            while current:
+                count += 1
+                current = current.next
+            self._length = count
+        return self._length
+
+    def _grow(self, delta: int) -> None:
+        if self._length is not None:
+            self._length += delta
 
     def __str__(self) -> str:
-        str_rep = "HEAD <-> "
+        # Single join over a generator instead of repeated string concatenation
+        return " <-> ".join(self._str_parts())
+
+    def _str_parts(self) -> Iterator[str]:
+        yield "HEAD"
+        for data in self:
+            yield str(data)
+        yield "TAIL"
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[Any]:
         current = self.head
         while current:
-            str_rep += f"{current.data} <-> "
+            yield current.data
             current = current.next
-        str_rep += "TAIL"
-        return str_rep
+
+    def __reversed__(self) -> Iterator[Any]:
+        current = self.tail
+        while current:
+            yield current.data
+            current = current.prev
 
     def insert_first(self, data: Any) -> Node:
         node = Node(data)
@@ -37,6 +77,7 @@ class DoublyLinkedList:
         else:
             self.head = node
             self.tail = node
+        self._grow(1)
         return node
 
     def delete_first(self) -> Optional[Node]:
@@ -51,9 +92,11 @@ class DoublyLinkedList:
                 # List has only one node
                 self.head = None
                 self.tail = None
+            deleted_node.next = None
+            self._grow(-1)
         return deleted_node
 
-    def insert_last(self, data: Any) -> None:
+    def insert_last(self, data: Any) -> Node:
         node = Node(data)
         if self.tail:
             self.tail.next = node
@@ -62,6 +105,8 @@ class DoublyLinkedList:
         else:
             self.head = node
             self.tail = node
+        self._grow(1)
+        return node
 
     def delete_last(self) -> Optional[Node]:
         deleted_node: Node = None
@@ -75,6 +120,8 @@ class DoublyLinkedList:
                 # List has only one node
                 self.head = None
                 self.tail = None
+            deleted_node.prev = None
+            self._grow(-1)
         return deleted_node
 
     def delete_node(self, node: Node) -> None:
@@ -98,6 +145,7 @@ class DoublyLinkedList:
             self.tail = prev_node
         node.next = None
         node.prev = None
+        self._grow(-1)
 
     def print(self) -> None:
         print(self)
@@ -106,12 +154,119 @@ class DoublyLinkedList:
         return self.head is None
 
     def size(self) -> int:
-        size = 0
-        current = self.head
-        while current:
-            size += 1
-            current = current.next
-        return size
+        return self.length
+
+    @classmethod
+    def from_iterable(cls, iterable: Iterable[Any]) -> "DoublyLinkedList":
+        """
+        Builds a list from the iterable in one pass
+        :return:
+        """
+        dll = cls()
+        dll.extend(iterable)
+        return dll
+
+    def extend(self, iterable: Iterable[Any]) -> None:
+        """
+        Appends every element of the iterable at the tail
+        Nodes are chained apart from the list and linked at the tail once at the end,
+        so extending a list with itself copies its elements once
+        :return:
+        """
+        head = None
+        tail = None
+        count = 0
+        for data in iterable:
+            node = Node(data)
+            if tail:
+                tail.next = node
+                node.prev = tail
+            else:
+                head = node
+            tail = node
+            count += 1
+        if head is None:
+            return
+        if self.tail:
+            self.tail.next = head
+            head.prev = self.tail
+        else:
+            self.head = head
+        self.tail = tail
+        self._grow(count)
+
+    def splice(self, other: "DoublyLinkedList") -> None:
+        """
+        Moves all the nodes of the other list to the tail of this list, the other list becomes empty
+        Nodes are relinked, not copied
+        Time Complexity = O(1)
+        :return:
+        """
+        if other is self or other.head is None:
+            return
+        if self.tail:
+            self.tail.next = other.head
+            other.head.prev = self.tail
+        else:
+            self.head = other.head
+        self.tail = other.tail
+        self._length = None if self._length is None or other._length is None else self._length + other._length
+        other.head = None
+        other.tail = None
+        other._length = 0
+
+    def split_at(self, node: Node, length: Optional[int] = None) -> "DoublyLinkedList":
+        """
+        Cuts the list before the node: this list keeps the nodes before it,
+        and the node with every node after it are moved to a new list
+        Time Complexity = O(1). When length is not given, the lengths of both lists become unknown
+        and are counted by their next len() (O(n) once).
+        :param node: A node of this list
+        :param length: Number of nodes from node to the tail, if known: keeps both lengths up to date
+        :return: New list starting at node
+        """
+        other = DoublyLinkedList()
+        other.head = node
+        other.tail = self.tail
+        other._length = length
+        prev_node = node.prev
+        if prev_node:
+            prev_node.next = None
+        else:
+            self.head = None
+        self.tail = prev_node
+        node.prev = None
+        if length is None or self._length is None:
+            self._length = None
+        else:
+            self._length -= length
+        return other
+
+
+def benchmark(nodes: int = 1000000) -> None:
+    """
+    Memory of a list of 'nodes' ints measured with tracemalloc, and latency of size, str, iteration
+    :return:
+    """
+    tracemalloc.start()
+    dll = DoublyLinkedList()
+    for i in range(nodes):
+        dll.insert_last(i)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"nodes = {nodes:,}, memory = {current / 2 ** 20:,.1f} MiB ({current / nodes:.0f} bytes/node)")
+    for name, operation in [("size", dll.size), ("len", lambda: len(dll)), ("str", lambda: str(dll)),
+                            ("iter", lambda: sum(dll)), ("reversed", lambda: sum(reversed(dll)))]:
+        start = time.perf_counter()
+        operation()
+        print(f"{name:<8} {(time.perf_counter() - start) * 1000:,.3f} ms")
+    # Reference point for the memory figure
+    tracemalloc.start()
+    reference = deque(range(nodes))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"deque of the same ints = {current / 2 ** 20:,.1f} MiB")
+    del reference
 
 
 def test_insert_first():
@@ -205,9 +360,92 @@ def test_size():
     assert test_dll.size() == 1
     test_dll.delete_last()
     assert test_dll.size() == 0
+    test_dll.delete_last()
+    assert test_dll.size() == 0
+    node = test_dll.insert_last(1)
+    test_dll.insert_last(2)
+    test_dll.delete_node(node)
+    assert test_dll.size() == len(test_dll) == 1
     print("test_size: successful")
 
 
+def test_iter_and_reversed():
+    test_dll = DoublyLinkedList()
+    assert list(test_dll) == []
+    assert list(reversed(test_dll)) == []
+    for i in range(1, 5):
+        test_dll.insert_last(i)
+    assert list(test_dll) == [1, 2, 3, 4]
+    assert list(reversed(test_dll)) == [4, 3, 2, 1]
+    assert len(test_dll) == 4
+    print("test_iter_and_reversed: successful")
+
+
+def test_node_has_no_dict():
+    node = Node(1)
+    assert not hasattr(node, "__dict__")
+    print("test_node_has_no_dict: successful")
+
+
+def test_from_iterable_and_extend():
+    test_dll = DoublyLinkedList.from_iterable(range(1, 4))
+    assert str(test_dll) == "HEAD <-> 1 <-> 2 <-> 3 <-> TAIL"
+    assert list(reversed(test_dll)) == [3, 2, 1]
+    test_dll.extend([4, 5])
+    assert str(test_dll) == "HEAD <-> 1 <-> 2 <-> 3 <-> 4 <-> 5 <-> TAIL"
+    assert list(reversed(test_dll)) == [5, 4, 3, 2, 1]
+    assert len(test_dll) == 5
+    empty = DoublyLinkedList.from_iterable([])
+    assert empty.is_empty() and len(empty) == 0
+    empty.extend([])
+    assert str(empty) == "HEAD <-> TAIL"
+    # Extending with itself copies the elements once
+    test_dll.extend(test_dll)
+    assert list(test_dll) == [1, 2, 3, 4, 5, 1, 2, 3, 4, 5]
+    assert list(reversed(test_dll)) == [5, 4, 3, 2, 1, 5, 4, 3, 2, 1]
+    assert len(test_dll) == 10
+    print("test_from_iterable_and_extend: successful")
+
+
+def test_splice():
+    first = DoublyLinkedList.from_iterable([1, 2])
+    second = DoublyLinkedList.from_iterable([3, 4])
+    node = second.head
+    first.splice(second)
+    assert str(first) == "HEAD <-> 1 <-> 2 <-> 3 <-> 4 <-> TAIL"
+    assert list(reversed(first)) == [4, 3, 2, 1]
+    assert len(first) == 4
+    assert second.is_empty() and len(second) == 0
+    # Nodes are moved, not copied
+    assert first.head.next.next is node
+    empty = DoublyLinkedList()
+    empty.splice(first)
+    assert str(empty) == "HEAD <-> 1 <-> 2 <-> 3 <-> 4 <-> TAIL"
+    empty.splice(DoublyLinkedList())
+    assert len(empty) == 4
+    print("test_splice: successful")
+
+
+def test_split_at():
+    test_dll = DoublyLinkedList.from_iterable([1, 2, 3, 4, 5])
+    node = test_dll.head.next.next
+    other = test_dll.split_at(node)
+    assert str(test_dll) == "HEAD <-> 1 <-> 2 <-> TAIL"
+    assert str(other) == "HEAD <-> 3 <-> 4 <-> 5 <-> TAIL"
+    assert list(reversed(test_dll)) == [2, 1] and list(reversed(other)) == [5, 4, 3]
+    # Split without a length is O(1), both lengths are counted lazily
+    assert test_dll._length is None and other._length is None
+    assert (len(test_dll), len(other)) == (2, 3)
+    other.insert_last(6)
+    assert other.delete_last().data == 6
+    whole = test_dll.split_at(test_dll.head, length=2)
+    assert test_dll.is_empty() and test_dll.tail is None and len(test_dll) == 0
+    assert str(whole) == "HEAD <-> 1 <-> 2 <-> TAIL"
+    whole.splice(other)
+    assert str(whole) == "HEAD <-> 1 <-> 2 <-> 3 <-> 4 <-> 5 <-> TAIL"
+    print("test_split_at: successful")
+
+
 def test_delete_node():
     test_dll = DoublyLinkedList()
     np1 = test_dll.insert_first(1)
@@ -233,4 +471,11 @@ if __name__ == "__main__":
     test_insert_last()
     test_delete_last()
     test_is_empty()
+    test_size()
     test_delete_node()
+    test_iter_and_reversed()
+    test_node_has_no_dict()
+    test_from_iterable_and_extend()
+    test_splice()
+    test_split_at()
+    # benchmark()
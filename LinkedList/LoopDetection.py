@@ -1,10 +1,24 @@
+"""
+Loop/Cycle detection
+Works on singly linked lists (Node.next pointers) and, more generally, on any functional iteration
+    x0, f(x0), f(f(x0)), ...
+such as PRNG states or hash chains. The sequence ends when f returns None (the end of a linked list).
+    1. Floyd: tortoise and hare, O(1) memory
+    2. Brent: teleporting tortoise, O(1) memory and fewer evaluations of f
+    3. Distinguished points: remembers a bounded sample of states, every state of the sequence is evaluated
+       only about once before the cycle is found, suited to huge state spaces where f is expensive
+"""
 import random
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional
 
 
 class Node:
     """
     Node if a singly linked list
     """
+    __slots__ = ("data", "next")
+
     def __init__(self, data):
         self.data = data
         self.next = None
@@ -28,6 +42,255 @@ def has_loop(head: Node) -> bool:
     return False
 
 
+class Cycle(NamedTuple):
+    """
+    Description of a loop/cycle
+        entry: first node of the list (or state of the sequence) which is part of the cycle
+        mu: number of nodes before the entry (tail-before-cycle length)
+        lam: number of nodes in the cycle
+    """
+    entry: Any
+    mu: int
+    lam: int
+
+
+def find_cycle_floyd(head: Node) -> Optional[Cycle]:
+    """
+    Floyd's tortoise and hare: the pointers meet inside the cycle after at most mu + lam steps,
+    then a pointer restarted from head and one from the meeting point meet at the entry after mu steps
+    Time Complexity = O(mu + lam)
+    Space Complexity = O(1)
+    :param head:
+    :return: Cycle, or None if the list has no loop
+    """
+    slow = head
+    fast = head
+    while fast and fast.next:
+        slow = slow.next
+        fast = fast.next.next
+        if slow is fast:
+            break
+    else:
+        return None
+    # Find the entry
+    mu = 0
+    slow = head
+    while slow is not fast:
+        slow = slow.next
+        fast = fast.next
+        mu += 1
+    # Measure the cycle
+    lam = 1
+    fast = slow.next
+    while fast is not slow:
+        fast = fast.next
+        lam += 1
+    return Cycle(slow, mu, lam)
+
+
+def find_cycle_brent(head: Node) -> Optional[Cycle]:
+    """
+    Brent's algorithm: the tortoise teleports to the hare every power of two steps,
+    so only the hare moves, and lam is known as soon as they meet
+    It does fewer pointer dereferences than Floyd's algorithm on average (one pointer moves instead of three)
+    Time Complexity = O(mu + lam)
+    Space Complexity = O(1)
+    :param head:
+    :return: Cycle, or None if the list has no loop
+    """
+    if head is None:
+        return None
+    power = lam = 1
+    tortoise = head
+    hare = head.next
+    while hare is not tortoise:
+        if hare is None:
+            return None
+        if power == lam:
+            tortoise = hare
+            power *= 2
+            lam = 0
+        hare = hare.next
+        lam += 1
+    # Hare starts lam nodes ahead, both meet at the entry after mu steps
+    tortoise = hare = head
+    for _ in range(lam):
+        hare = hare.next
+    mu = 0
+    while tortoise is not hare:
+        tortoise = tortoise.next
+        hare = hare.next
+        mu += 1
+    return Cycle(tortoise, mu, lam)
+
+
+def _next_node(node: Node) -> Optional[Node]:
+    return node.next
+
+
+def _find_mu(x0: Any, f: Callable[[Any], Any], lam: int) -> Cycle:
+    """
+    Knowing lam, starts one state at x0 and another lam steps ahead, they meet at the entry after mu steps
+    :return:
+    """
+    tortoise = hare = x0
+    for _ in range(lam):
+        hare = f(hare)
+    mu = 0
+    while tortoise != hare:
+        tortoise = f(tortoise)
+        hare = f(hare)
+        mu += 1
+    return Cycle(tortoise, mu, lam)
+
+
+def floyd(x0: Any, f: Optional[Callable[[Any], Any]] = None) -> Optional[Cycle]:
+    """
+    Floyd's cycle detection of the sequence x0, f(x0), f(f(x0)), ...
+    :param x0: Initial state, or head Node of a linked list when f is None
+    :param f: Transition function, returns None when the sequence ends
+    :return: Cycle, or None if the sequence ends
+    """
+    if f is None:
+        return find_cycle_floyd(x0)
+    if x0 is None:
+        return None
+    slow = x0
+    fast = x0
+    while True:
+        slow = f(slow)
+        fast = f(fast)
+        if fast is None:
+            return None
+        fast = f(fast)
+        if fast is None:
+            return None
+        if slow == fast:
+            break
+    # Find the entry
+    mu = 0
+    slow = x0
+    while slow != fast:
+        slow = f(slow)
+        fast = f(fast)
+        mu += 1
+    # Measure the cycle
+    lam = 1
+    fast = f(slow)
+    while fast != slow:
+        fast = f(fast)
+        lam += 1
+    return Cycle(slow, mu, lam)
+
+
+def brent(x0: Any, f: Optional[Callable[[Any], Any]] = None) -> Optional[Cycle]:
+    """
+    Brent's cycle detection of the sequence x0, f(x0), f(f(x0)), ...
+    :param x0: Initial state, or head Node of a linked list when f is None
+    :param f: Transition function, returns None when the sequence ends
+    :return: Cycle, or None if the sequence ends
+    """
+    if f is None:
+        return find_cycle_brent(x0)
+    if x0 is None:
+        return None
+    power = lam = 1
+    tortoise = x0
+    hare = f(x0)
+    while hare != tortoise:
+        if hare is None:
+            return None
+        if power == lam:
+            tortoise = hare
+            power *= 2
+            lam = 0
+        hare = f(hare)
+        lam += 1
+    return _find_mu(x0, f, lam)
+
+
+def distinguished_points(x0: Any, f: Optional[Callable[[Any], Any]] = None, max_points: int = 1024,
+                         key: Callable[[Any], int] = hash) -> Optional[Cycle]:
+    """
+    Memory-bounded cycle detection of the sequence x0, f(x0), f(f(x0)), ...
+    Only distinguished states, those whose key has its low bits at zero, are remembered with their step.
+    The first remembered state seen again is in the cycle and the steps in between are exactly lam.
+    When more than max_points states are remembered, one more low bit must be zero and the others are forgotten.
+    A state is also remembered when no state was for a while, so a short cycle without any
+    distinguished state is still found.
+    Time Complexity = O(mu + lam) evaluations of f to find lam, plus O(mu + lam) to locate the entry
+    Space Complexity = O(max_points)
+    :param x0: Initial state, or head Node of a linked list when f is None
+    :param f: Transition function, returns None when the sequence ends
+    :param max_points: Maximum number of remembered states
+    :param key: Integer hash of a state, should be stable and well mixed
+    :return: Cycle, or None if the sequence ends
+    """
+    if f is None:
+        f = _next_node
+    if x0 is None:
+        return None
+    mask = 0
+    points: Dict[Any, int] = dict()
+    step = 0
+    last_point = 0
+    state = x0
+    while True:
+        seen = points.get(state)
+        if seen is not None:
+            return _find_mu(x0, f, step - seen)
+        if key(state) & mask == 0 or step - last_point > 8 * (mask + 1):
+            points[state] = step
+            last_point = step
+            if len(points) > max_points:
+                mask = (mask << 1) | 1
+                points = {point: at for point, at in points.items() if key(point) & mask == 0}
+        state = f(state)
+        if state is None:
+            return None
+        step += 1
+
+
+def make_list(size: int, cycle_index: Optional[int] = None) -> Node:
+    """
+    Builds a list of 'size' nodes with data 0 to size - 1,
+    the last node points back to the node at cycle_index if given
+    :return: head
+    """
+    head = Node(0)
+    node = head
+    cycle_node = head if cycle_index == 0 else None
+    for i in range(1, size):
+        node.next = Node(i)
+        node = node.next
+        if i == cycle_index:
+            cycle_node = node
+    node.next = cycle_node
+    return head
+
+
+def benchmark(size: int = 10000000, runs: int = 3) -> None:
+    """
+    Compares has_loop, find_cycle_floyd and find_cycle_brent on lists of 'size' nodes with a random cycle
+    :return:
+    """
+    rng = random.Random(8)
+    for _ in range(runs):
+        cycle_index = rng.randrange(size)
+        head = make_list(size, cycle_index)
+        print(f"size = {size:,}, mu = {cycle_index:,}, lam = {size - cycle_index:,}")
+        for function in (has_loop, find_cycle_floyd, find_cycle_brent):
+            start = time.perf_counter()
+            function(head)
+            print(f"    {function.__name__:<17} {time.perf_counter() - start:.2f}s")
+        # Break the cycle so the nodes can be freed by reference counting
+        node = head
+        for _ in range(size - 1):
+            node = node.next
+        node.next = None
+        del head, node
+
+
 def test_has_loop_with_loop_in_the_middle():
     a = Node(1)
     b = Node(2)
@@ -107,5 +370,88 @@ def test_has_loop_with_loop_very_big_list():
     assert has_loop(node)
 
 
+def test_find_cycle():
+    for find_cycle in (find_cycle_floyd, find_cycle_brent):
+        for size in range(1, 30):
+            for cycle_index in range(size):
+                head = make_list(size, cycle_index)
+                cycle = find_cycle(head)
+                assert cycle.entry.data == cycle_index
+                assert cycle.mu == cycle_index
+                assert cycle.lam == size - cycle_index
+            assert find_cycle(make_list(size)) is None
+        assert find_cycle(None) is None
+
+
+def test_find_cycle_very_big_list():
+    max_nodes = 10000
+    random_cycle_index = int(random.random() * max_nodes)
+    head = make_list(max_nodes, random_cycle_index)
+    expected = (random_cycle_index, max_nodes - random_cycle_index)
+    floyd = find_cycle_floyd(head)
+    brent = find_cycle_brent(head)
+    assert (floyd.mu, floyd.lam) == expected
+    assert (brent.mu, brent.lam) == expected
+    assert floyd.entry is brent.entry
+
+
+def _brute_force(x0, f):
+    seen = dict()
+    state = x0
+    step = 0
+    while state not in seen:
+        seen[state] = step
+        state = f(state)
+        step += 1
+    return seen[state], step - seen[state]
+
+
+def test_functional_iteration():
+    functions = [
+        lambda x: (x * x + 1) % 255,
+        lambda x: (x * 1103515245 + 12345) % 2 ** 12,
+        lambda x: (x * x * 7 + 3 * x + 1) % 10007,
+        lambda x: 0,
+    ]
+    for f in functions:
+        for x0 in range(0, 50, 7):
+            mu, lam = _brute_force(x0, f)
+            for detect in (floyd, brent, distinguished_points):
+                cycle = detect(x0, f)
+                assert (cycle.mu, cycle.lam) == (mu, lam)
+                state = x0
+                for _ in range(mu):
+                    state = f(state)
+                assert cycle.entry == state
+
+
+def test_functional_iteration_terminating_sequence():
+    def countdown(x):
+        return x - 1 if x > 0 else None
+
+    for detect in (floyd, brent, distinguished_points):
+        assert detect(100, countdown) is None
+        assert detect(0, countdown) is None
+
+
+def test_distinguished_points_memory_bound():
+    def f(x):
+        return (x * 6364136223846793005 + 1442695040888963407) % 2 ** 16
+
+    mu, lam = _brute_force(1, f)
+    cycle = distinguished_points(1, f, max_points=16)
+    assert (cycle.mu, cycle.lam) == (mu, lam)
+
+
+def test_generic_detection_on_linked_list():
+    for detect in (floyd, brent, distinguished_points):
+        head = make_list(50, 20)
+        cycle = detect(head)
+        assert (cycle.entry.data, cycle.mu, cycle.lam) == (20, 20, 30)
+        assert detect(make_list(50)) is None
+        assert detect(None) is None
+
+
 if __name__ == "__main__":
     print("Loop/Cycle Detection using two pointers")
+    # benchmark()
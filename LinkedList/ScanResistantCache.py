@@ -0,0 +1,357 @@
+"""
+Scan resistant cache policies
+
+With plain LRU every new key goes to the head, so a single pass over many cold keys
+(a scan) pushes the whole hot set out of the cache.
+The policies below keep new keys apart from the keys which proved to be popular:
+    1. Segmented LRU (SLRU): new keys enter a probation segment and only a second hit
+       promotes them into the protected segment
+    2. W-TinyLFU: new keys enter a small LRU window, and when they leave it a frequency
+       filter (count-min sketch) decides whether they are worth more than the main cache victim
+Both are built from LRUCache segments and reuse its doubly linked list machinery.
+"""
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+from LruCache import LRUCache, LRUCacheBasic, Node
+
+
+class Cache(ABC):
+    """
+    Common interface of the cache policies
+    'get' returns -1 on a miss
+    """
+    @abstractmethod
+    def get(self, key: Any) -> Any:
+        pass
+
+    @abstractmethod
+    def put(self, key: Any, value: Any) -> None:
+        pass
+
+
+Cache.register(LRUCache)
+Cache.register(LRUCacheBasic)
+
+
+class SegmentedLRUCache(Cache):
+    """
+    Segmented LRU Cache
+    Recency list is split in two segments:
+        probation: keys seen once, new keys are put at its head
+        protected: keys hit at least twice, size is limited to protected_ratio of the capacity
+    A hit in probation promotes the key into protected, the protected tail is then demoted back to probation.
+    Victims are taken from the probation tail first, so a scan only churns the probation segment.
+    'get' and 'put' both operations are performed in O(1) time
+    """
+    def __init__(self, capacity: int, protected_ratio: float = 0.8):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        protected_capacity = min(capacity - 1, int(capacity * protected_ratio)) if capacity > 1 else 0
+        # Segments are only used for their lists and maps, capacity is enforced here
+        self.probation = LRUCache(capacity - protected_capacity)
+        self.protected = LRUCache(protected_capacity)
+
+    @property
+    def size(self) -> int:
+        return self.probation.size + self.protected.size
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self.probation.map or key in self.protected.map
+
+    def _touch(self, key: Any) -> Optional[Node]:
+        """
+        Records a hit on the key
+        :return: Node of the key or None on a miss
+        """
+        node = self.protected.map.get(key)
+        if node is not None:
+            if node is not self.protected.head:
+                self.protected._delete_node(node)
+                self.protected._insert_first(node)
+            return node
+        node = self.probation.map.get(key)
+        if node is None:
+            return None
+        # Second hit, promote to protected
+        self.probation._remove(node)
+        self.protected._add(node)
+        if self.protected.size > self.protected.capacity:
+            demoted = self.protected.tail
+            self.protected._remove(demoted)
+            self.probation._add(demoted)
+        return node
+
+    def victim(self) -> Optional[Node]:
+        """
+        Returns the node which would be evicted next
+        :return:
+        """
+        return self.probation.tail or self.protected.tail
+
+    def evict(self) -> Optional[Node]:
+        node = self.victim()
+        if node is self.probation.tail:
+            self.probation._remove(node)
+        elif node is not None:
+            self.protected._remove(node)
+        return node
+
+    def admit(self, node: Node) -> None:
+        """
+        Adds a new node at the head of probation, evicting a victim if the cache is full
+        :return:
+        """
+        if self.size >= self.capacity:
+            self.evict()
+        self.probation._add(node)
+
+    def get(self, key: Any) -> Any:
+        node = self._touch(key)
+        if node is None:
+            return -1
+        return node.value
+
+    def put(self, key: Any, value: Any) -> None:
+        node = self._touch(key)
+        if node is not None:
+            node.value = value
+            return
+        self.admit(Node(key, value))
+
+
+class CountMinSketch:
+    """
+    Approximate frequency counter in fixed memory
+    Every key increments one counter in each of the 'depth' rows and its frequency is the minimum of them.
+    Counters saturate at 15 and are all halved once 'sample_size' increments have been recorded,
+    so old popularity fades out.
+    """
+    MAX_COUNT = 15
+    SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5)
+
+    def __init__(self, width: int, sample_size: int, depth: int = 4):
+        # Round the width up to a power of two so that the row index is a bit mask
+        self.width = 1 << max(width - 1, 1).bit_length()
+        self.mask = self.width - 1
+        self.depth = min(depth, len(self.SEEDS))
+        self.table = bytearray(self.width * self.depth)
+        self.sample_size = sample_size
+        self.additions = 0
+
+    def _indexes(self, key: Any) -> List[int]:
+        h = hash(key)
+        return [row * self.width + (((h ^ seed) * seed) >> 32 & self.mask)
+                for row, seed in enumerate(self.SEEDS[:self.depth])]
+
+    def increment(self, key: Any) -> None:
+        table = self.table
+        for index in self._indexes(key):
+            if table[index] < self.MAX_COUNT:
+                table[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.reset()
+
+    def frequency(self, key: Any) -> int:
+        table = self.table
+        return min(table[index] for index in self._indexes(key))
+
+    def reset(self) -> None:
+        """
+        Halves every counter (aging)
+        :return:
+        """
+        self.table = bytearray(count >> 1 for count in self.table)
+        self.additions //= 2
+
+
+class WTinyLFUCache(Cache):
+    """
+    Window TinyLFU Cache
+        window: small LRU (window_ratio of the capacity) where every new key is put
+        main: segmented LRU holding the rest of the capacity
+    When a key falls off the window tail it competes with the main victim,
+    and is admitted only if the sketch estimates it more frequent, otherwise it is dropped.
+    """
+    def __init__(self, capacity: int, window_ratio: float = 0.01, protected_ratio: float = 0.8):
+        if capacity < 2:
+            raise ValueError("capacity must be at least 2")
+        self.capacity = capacity
+        window_capacity = max(1, int(capacity * window_ratio))
+        self.window = LRUCache(window_capacity)
+        self.main = SegmentedLRUCache(capacity - window_capacity, protected_ratio)
+        self.sketch = CountMinSketch(capacity, sample_size=10 * capacity)
+
+    @property
+    def size(self) -> int:
+        return self.window.size + self.main.size
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self.window.map or key in self.main
+
+    def _touch(self, key: Any) -> Optional[Node]:
+        node = self.window.map.get(key)
+        if node is not None:
+            if node is not self.window.head:
+                self.window._delete_node(node)
+                self.window._insert_first(node)
+            return node
+        return self.main._touch(key)
+
+    def _evict_window(self) -> None:
+        candidate = self.window.tail
+        self.window._remove(candidate)
+        if self.main.size < self.main.capacity:
+            self.main.admit(candidate)
+            return
+        victim = self.main.victim()
+        if self.sketch.frequency(candidate.key) > self.sketch.frequency(victim.key):
+            self.main.admit(candidate)
+
+    def get(self, key: Any) -> Any:
+        self.sketch.increment(key)
+        node = self._touch(key)
+        if node is None:
+            return -1
+        return node.value
+
+    def put(self, key: Any, value: Any) -> None:
+        self.sketch.increment(key)
+        node = self._touch(key)
+        if node is not None:
+            node.value = value
+            return
+        self.window._add(Node(key, value))
+        if self.window.size > self.window.capacity:
+            self._evict_window()
+
+
+def make_trace(length: int, key_space: int, hot_keys: int, scan_every: int, scan_length: int,
+               seed: int = 1) -> List[int]:
+    """
+    Synthetic access trace: Zipf-like requests over 'hot_keys' keys,
+    interrupted every 'scan_every' requests by a scan of 'scan_length' keys never requested before
+    :return:
+    """
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(hot_keys)]
+    trace = []
+    next_scan_key = hot_keys
+    while len(trace) < length:
+        trace.extend(rng.choices(range(hot_keys), weights, k=scan_every))
+        trace.extend(range(next_scan_key, next_scan_key + scan_length))
+        next_scan_key = hot_keys + (next_scan_key + scan_length - hot_keys) % (key_space - hot_keys)
+    return trace[:length]
+
+
+def hit_ratio(cache: Cache, trace: List[int]) -> float:
+    """
+    Replays the trace: a miss loads the key into the cache
+    :return:
+    """
+    hits = 0
+    for key in trace:
+        if cache.get(key) == -1:
+            cache.put(key, key)
+        else:
+            hits += 1
+    return hits / len(trace)
+
+
+def benchmark_hit_ratio(capacity: int = 1000, length: int = 500000) -> None:
+    """
+    Compares the hit ratio of LRU, SLRU and W-TinyLFU on traces with and without scans
+    :return:
+    """
+    traces: Dict[str, List[int]] = {
+        "zipf": make_trace(length, 10 ** 6, 10 * capacity, length, 0),
+        "zipf + scans": make_trace(length, 10 ** 6, 10 * capacity, 10 * capacity, 2 * capacity),
+    }
+    factories: List[Callable[[int], Cache]] = [LRUCache, SegmentedLRUCache, WTinyLFUCache]
+    for name, trace in traces.items():
+        for factory in factories:
+            start = time.perf_counter()
+            ratio = hit_ratio(factory(capacity), trace)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<14} {factory.__name__:<18} hit ratio = {ratio:.3f}, time = {elapsed:.2f}s")
+
+
+def test_cache_interface():
+    assert isinstance(LRUCache(1), Cache)
+    assert isinstance(SegmentedLRUCache(1), Cache)
+    assert isinstance(WTinyLFUCache(2), Cache)
+
+
+def test_segmented_lru_promotion():
+    cache = SegmentedLRUCache(4, protected_ratio=0.5)
+    for key in range(4):
+        cache.put(key, key)
+    assert cache.get(0) == 0
+    assert cache.get(1) == 1
+    assert set(cache.protected.map) == {0, 1}
+    # Probation is full of keys seen once, a third promotion demotes the protected tail
+    assert cache.get(2) == 2
+    assert set(cache.protected.map) == {1, 2}
+    assert 0 in cache.probation.map
+    assert cache.size == 4
+
+
+def test_segmented_lru_scan_resistance():
+    cache = SegmentedLRUCache(10, protected_ratio=0.5)
+    for key in range(5):
+        cache.put(key, key)
+        cache.get(key)
+    for key in range(100, 200):
+        cache.put(key, key)
+    assert all(cache.get(key) == key for key in range(5))
+    assert cache.size == 10
+
+
+def test_segmented_lru_single_entry():
+    cache = SegmentedLRUCache(1)
+    cache.put(1, 1)
+    assert cache.get(1) == 1
+    cache.put(2, 2)
+    assert cache.get(1) == -1
+    assert cache.get(2) == 2
+    assert cache.size == 1
+
+
+def test_count_min_sketch():
+    sketch = CountMinSketch(64, sample_size=1000)
+    for _ in range(5):
+        sketch.increment("hot")
+    sketch.increment("cold")
+    assert sketch.frequency("hot") >= 5
+    assert sketch.frequency("cold") >= 1
+    assert sketch.frequency("hot") > sketch.frequency("missing")
+    sketch.reset()
+    assert sketch.frequency("hot") >= 2
+
+
+def test_w_tiny_lfu_keeps_frequent_keys():
+    cache = WTinyLFUCache(20)
+    for _ in range(10):
+        for key in range(10):
+            if cache.get(key) == -1:
+                cache.put(key, key)
+    for key in range(1000, 1200):
+        cache.put(key, key)
+    assert sum(cache.get(key) == key for key in range(10)) == 10
+    assert cache.size <= 20
+
+
+def test_scan_resistant_policies_beat_lru_on_scans():
+    trace = make_trace(20000, 10 ** 5, 500, 500, 100)
+    lru = hit_ratio(LRUCache(50), trace)
+    assert hit_ratio(SegmentedLRUCache(50), trace) > lru
+    assert hit_ratio(WTinyLFUCache(50), trace) > lru
+
+
+if __name__ == "__main__":
+    print("Scan resistant cache policies")
+    benchmark_hit_ratio()
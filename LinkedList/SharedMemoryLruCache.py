@@ -0,0 +1,407 @@
+"""
+LRU Cache living in a multiprocessing.shared_memory block, shared by the worker processes of a pre-fork server
+
+Layout of the block, every integer is a signed 64-bit value:
+    header:  capacity, slot_size, bucket_count, head, tail, size, next_unused, free
+    buckets: bucket_count slot indexes, first slot of every hash chain
+    slots:   capacity fixed-size slots of
+                prev, next     -> recency list links
+                chain          -> next slot in the same hash bucket
+                hash           -> hash of the key
+                key_length, value_length (32-bit)
+                data           -> encoded key followed by the pickled value, at most slot_size bytes
+Slot indexes are used instead of pointers and NIL (-1) means no slot.
+Keys are hashed and compared by their encoded bytes (see encode_key), so the hash is the same in every process.
+"""
+import hashlib
+import io
+import multiprocessing
+import pickle
+import struct
+from multiprocessing import shared_memory
+from typing import Any, Optional, Tuple
+
+NIL = -1
+# Fixed so that every process (and Python version) encodes a key to the same bytes
+KEY_PROTOCOL = 4
+KEY_TYPES = (str, bytes, int, float, type(None))
+HEADER = struct.Struct("8q")
+INDEX = struct.Struct("q")
+SLOT_HEADER = struct.Struct("4q2i")
+# Offsets inside the header
+HEAD, TAIL, SIZE, NEXT_UNUSED, FREE = 3, 4, 5, 6, 7
+# Offsets inside a slot header
+PREV, NEXT, CHAIN = 0, 1, 2
+
+
+def _normalize_key(key: Any) -> Any:
+    """
+    Maps equal keys to the same value: bools and integral floats become ints (True == 1 == 1.0)
+    :return:
+    """
+    if isinstance(key, tuple):
+        return tuple(_normalize_key(item) for item in key)
+    if not isinstance(key, KEY_TYPES):
+        raise TypeError(f"keys must be str, bytes, int, float, bool, None or tuples of them, not {type(key).__name__}")
+    if isinstance(key, bool):
+        return int(key)
+    if isinstance(key, float) and key.is_integer():
+        return int(key)
+    return key
+
+
+def encode_key(key: Any) -> bytes:
+    """
+    Deterministic encoding of a key: equal keys give equal bytes
+    The key is normalized and pickled without the memo, which would otherwise encode an object repeated
+    inside the key (e.g. (s, s)) differently from an equal key made of distinct objects
+    :return:
+    """
+    buffer = io.BytesIO()
+    pickler = pickle.Pickler(buffer, KEY_PROTOCOL)
+    pickler.fast = True
+    pickler.dump(_normalize_key(key))
+    return buffer.getvalue()
+
+
+class SharedMemoryLRUCache:
+    """
+    LRU Cache shared across processes, same 'get' / 'put' API as LRUCache
+    The creating process passes create=True and the workers either inherit the object through fork
+    or attach to the block by name with the same lock.
+    Every operation holds the cross-process lock, 'get' and 'put' both operations are performed in O(1) time
+    Keys are limited to str, bytes, int, float, bool, None and tuples of them, see encode_key
+    """
+    def __init__(self, capacity: int = 0, slot_size: int = 256, name: Optional[str] = None, create: bool = True,
+                 lock: Optional[Any] = None):
+        """
+        :param capacity: Maximum number of entries, only used when creating the block
+        :param slot_size: Maximum size in bytes of an encoded key plus its pickled value, only used when creating
+        :param name: Name of the shared memory block, generated when creating without a name
+        :param create: Create and initialize a new block, or attach to the existing block called name
+        :param lock: Cross-process lock, every process using the block must share the same one
+        """
+        self.lock = lock if lock is not None else multiprocessing.Lock()
+        if create:
+            if capacity < 1:
+                raise ValueError("capacity must be positive")
+            bucket_count = 1 << (capacity * 2 - 1).bit_length()
+            total = HEADER.size + bucket_count * INDEX.size + capacity * (SLOT_HEADER.size + slot_size)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=total)
+            HEADER.pack_into(self.shm.buf, 0, capacity, slot_size, bucket_count, NIL, NIL, 0, 0, NIL)
+            for bucket in range(bucket_count):
+                INDEX.pack_into(self.shm.buf, HEADER.size + bucket * INDEX.size, NIL)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.capacity, self.slot_size, self.bucket_count = HEADER.unpack_from(self.shm.buf, 0)[:3]
+        self.buckets_offset = HEADER.size
+        self.slots_offset = HEADER.size + self.bucket_count * INDEX.size
+        self.slot_stride = SLOT_HEADER.size + self.slot_size
+
+    @classmethod
+    def attach(cls, name: str, lock: Any) -> "SharedMemoryLRUCache":
+        return cls(name=name, create=False, lock=lock)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def size(self) -> int:
+        return self._header(SIZE)
+
+    def close(self) -> None:
+        self.shm.close()
+
+    def unlink(self) -> None:
+        """
+        Destroys the block, call once from the creating process after the workers are done
+        :return:
+        """
+        self.shm.unlink()
+
+    # Raw accessors of the block
+    def _header(self, field: int) -> int:
+        return INDEX.unpack_from(self.shm.buf, field * INDEX.size)[0]
+
+    def _set_header(self, field: int, value: int) -> None:
+        INDEX.pack_into(self.shm.buf, field * INDEX.size, value)
+
+    def _bucket(self, bucket: int) -> int:
+        return INDEX.unpack_from(self.shm.buf, self.buckets_offset + bucket * INDEX.size)[0]
+
+    def _set_bucket(self, bucket: int, slot: int) -> None:
+        INDEX.pack_into(self.shm.buf, self.buckets_offset + bucket * INDEX.size, slot)
+
+    def _slot_offset(self, slot: int) -> int:
+        return self.slots_offset + slot * self.slot_stride
+
+    def _link(self, slot: int, field: int) -> int:
+        return INDEX.unpack_from(self.shm.buf, self._slot_offset(slot) + field * INDEX.size)[0]
+
+    def _set_link(self, slot: int, field: int, value: int) -> None:
+        INDEX.pack_into(self.shm.buf, self._slot_offset(slot) + field * INDEX.size, value)
+
+    def _slot_header(self, slot: int) -> Tuple[int, int, int, int, int, int]:
+        return SLOT_HEADER.unpack_from(self.shm.buf, self._slot_offset(slot))
+
+    def _slot_data(self, slot: int, start: int, length: int) -> bytes:
+        offset = self._slot_offset(slot) + SLOT_HEADER.size + start
+        return bytes(self.shm.buf[offset:offset + length])
+
+    # Recency list, same operations as LRUCache on slot indexes
+    def _insert_first(self, slot: int) -> None:
+        head = self._header(HEAD)
+        self._set_link(slot, PREV, NIL)
+        self._set_link(slot, NEXT, head)
+        if head != NIL:
+            self._set_link(head, PREV, slot)
+        else:
+            self._set_header(TAIL, slot)
+        self._set_header(HEAD, slot)
+
+    def _delete_slot(self, slot: int) -> None:
+        prev_slot = self._link(slot, PREV)
+        next_slot = self._link(slot, NEXT)
+        if prev_slot != NIL:
+            self._set_link(prev_slot, NEXT, next_slot)
+        else:
+            self._set_header(HEAD, next_slot)
+        if next_slot != NIL:
+            self._set_link(next_slot, PREV, prev_slot)
+        else:
+            self._set_header(TAIL, prev_slot)
+
+    # Hash index
+    @staticmethod
+    def _hash(key_bytes: bytes) -> int:
+        return int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), "little", signed=True)
+
+    def _find(self, key_bytes: bytes, key_hash: int) -> int:
+        slot = self._bucket(key_hash & (self.bucket_count - 1))
+        while slot != NIL:
+            _, _, chain, slot_hash, key_length, _ = self._slot_header(slot)
+            if slot_hash == key_hash and key_length == len(key_bytes) \
+                    and self._slot_data(slot, 0, key_length) == key_bytes:
+                return slot
+            slot = chain
+        return NIL
+
+    def _unchain(self, slot: int, key_hash: int) -> None:
+        bucket = key_hash & (self.bucket_count - 1)
+        current = self._bucket(bucket)
+        if current == slot:
+            self._set_bucket(bucket, self._link(slot, CHAIN))
+            return
+        while current != NIL:
+            chain = self._link(current, CHAIN)
+            if chain == slot:
+                self._set_link(current, CHAIN, self._link(slot, CHAIN))
+                return
+            current = chain
+
+    def _write(self, slot: int, key_bytes: bytes, key_hash: int, value_bytes: bytes) -> None:
+        prev_slot, next_slot, chain = self._slot_header(slot)[:3]
+        offset = self._slot_offset(slot)
+        SLOT_HEADER.pack_into(self.shm.buf, offset, prev_slot, next_slot, chain, key_hash,
+                              len(key_bytes), len(value_bytes))
+        data = offset + SLOT_HEADER.size
+        self.shm.buf[data:data + len(key_bytes)] = key_bytes
+        data += len(key_bytes)
+        self.shm.buf[data:data + len(value_bytes)] = value_bytes
+
+    def get(self, key: Any) -> Any:
+        key_bytes = encode_key(key)
+        key_hash = self._hash(key_bytes)
+        with self.lock:
+            slot = self._find(key_bytes, key_hash)
+            if slot == NIL:
+                return -1
+            if slot != self._header(HEAD):
+                self._delete_slot(slot)
+                self._insert_first(slot)
+            key_length, value_length = self._slot_header(slot)[4:]
+            value_bytes = self._slot_data(slot, key_length, value_length)
+        return pickle.loads(value_bytes)
+
+    def put(self, key: Any, value: Any) -> None:
+        key_bytes = encode_key(key)
+        value_bytes = pickle.dumps(value)
+        if len(key_bytes) + len(value_bytes) > self.slot_size:
+            raise ValueError(f"key and value take {len(key_bytes) + len(value_bytes)} bytes, "
+                             f"slot_size is {self.slot_size}")
+        key_hash = self._hash(key_bytes)
+        with self.lock:
+            slot = self._find(key_bytes, key_hash)
+            if slot != NIL:
+                # If the key already present then update the value and put the item at the front
+                self._write(slot, key_bytes, key_hash, value_bytes)
+                if slot != self._header(HEAD):
+                    self._delete_slot(slot)
+                    self._insert_first(slot)
+                return
+            size = self._header(SIZE)
+            if size == self.capacity:
+                # Reuse the slot on tail for the new entry
+                slot = self._header(TAIL)
+                self._delete_slot(slot)
+                self._unchain(slot, self._slot_header(slot)[3])
+                size -= 1
+            elif self._header(FREE) != NIL:
+                slot = self._header(FREE)
+                self._set_header(FREE, self._link(slot, NEXT))
+            else:
+                slot = self._header(NEXT_UNUSED)
+                self._set_header(NEXT_UNUSED, slot + 1)
+            bucket = key_hash & (self.bucket_count - 1)
+            self._set_link(slot, CHAIN, self._bucket(bucket))
+            self._set_bucket(bucket, slot)
+            self._write(slot, key_bytes, key_hash, value_bytes)
+            self._insert_first(slot)
+            self._set_header(SIZE, size + 1)
+
+    def delete(self, key: Any) -> bool:
+        """
+        Removes the key from the cache and returns its slot to the free-list
+        :return: True if the key was present
+        """
+        key_bytes = encode_key(key)
+        key_hash = self._hash(key_bytes)
+        with self.lock:
+            slot = self._find(key_bytes, key_hash)
+            if slot == NIL:
+                return False
+            self._delete_slot(slot)
+            self._unchain(slot, key_hash)
+            self._set_link(slot, NEXT, self._header(FREE))
+            self._set_header(FREE, slot)
+            self._set_header(SIZE, self._header(SIZE) - 1)
+            return True
+
+
+def _worker(name: str, lock: Any, offset: int, count: int) -> None:
+    cache = SharedMemoryLRUCache.attach(name, lock)
+    for key in range(offset, offset + count):
+        cache.put(key, f"value-{key}")
+    cache.close()
+
+
+def test_shared_memory_lru_cache_eviction_order():
+    cache = SharedMemoryLRUCache(2)
+    try:
+        cache.put(1, 1)
+        cache.put(2, 2)
+        assert cache.get(1) == 1
+        cache.put(3, 3)
+        assert cache.get(2) == -1
+        assert cache.get(1) == 1
+        assert cache.get(3) == 3
+        cache.put(1, "one")
+        cache.put(4, 4)
+        assert cache.get(3) == -1
+        assert cache.get(1) == "one"
+        assert cache.size == 2
+    finally:
+        cache.close()
+        cache.unlink()
+
+
+def test_shared_memory_lru_cache_delete_and_reuse():
+    cache = SharedMemoryLRUCache(3)
+    try:
+        for key in ("a", "b", "c"):
+            cache.put(key, key.upper())
+        assert cache.delete("b")
+        assert not cache.delete("b")
+        cache.put("d", "D")
+        cache.put(("tuple", 1), [1, 2])
+        assert cache.get("b") == -1
+        assert cache.get("a") == -1
+        assert cache.get("d") == "D"
+        assert cache.get(("tuple", 1)) == [1, 2]
+        assert cache.size == 3
+    finally:
+        cache.close()
+        cache.unlink()
+
+
+def test_shared_memory_lru_cache_equal_keys():
+    cache = SharedMemoryLRUCache(4)
+    try:
+        first = "".join(["sha", "red"])
+        second = "".join(["shar", "ed"])
+        assert first == second and first is not second
+        cache.put((first, first), 1)
+        assert cache.get((first, second)) == 1
+        cache.put((second, first), 2)
+        assert cache.size == 1
+        assert cache.get((first, first)) == 2
+        cache.put(1, "int")
+        assert cache.get(1.0) == "int" and cache.get(True) == "int"
+        cache.put(2.0, "float")
+        assert cache.get(2) == "float"
+        assert cache.size == 3
+        assert encode_key(("a", 1.5, None, b"x")) == encode_key(("a", 1.5, None, b"x"))
+        try:
+            cache.put([1, 2], "list")
+            assert False, "TypeError expected"
+        except TypeError:
+            pass
+    finally:
+        cache.close()
+        cache.unlink()
+
+
+def test_shared_memory_lru_cache_slot_size():
+    cache = SharedMemoryLRUCache(2, slot_size=32)
+    try:
+        try:
+            cache.put("key", "x" * 100)
+            assert False, "ValueError expected"
+        except ValueError:
+            pass
+        assert cache.size == 0
+    finally:
+        cache.close()
+        cache.unlink()
+
+
+def test_shared_memory_lru_cache_matches_lru_cache():
+    import random
+    from LruCache import LRUCache
+    rng = random.Random(2)
+    shared = SharedMemoryLRUCache(4)
+    lru = LRUCache(4)
+    try:
+        for _ in range(2000):
+            key = rng.randrange(10)
+            if rng.random() < 0.5:
+                shared.put(key, key * 7)
+                lru.put(key, key * 7)
+            else:
+                assert shared.get(key) == lru.get(key)
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def test_shared_memory_lru_cache_across_processes():
+    context = multiprocessing.get_context("spawn")
+    lock = context.Lock()
+    cache = SharedMemoryLRUCache(400, lock=lock)
+    try:
+        workers = [context.Process(target=_worker, args=(cache.name, lock, i * 100, 100)) for i in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            assert worker.exitcode == 0
+        assert cache.size == 400
+        assert all(cache.get(key) == f"value-{key}" for key in range(400))
+    finally:
+        cache.close()
+        cache.unlink()
+
+
+if __name__ == "__main__":
+    print("LRU Cache Implementation - shared memory")
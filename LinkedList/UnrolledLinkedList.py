@@ -0,0 +1,336 @@
+"""
+Unrolled linked list: a doubly linked list of blocks, each block holding up to block_size elements
+One node per block instead of one node per element means far fewer allocations and pointers,
+and neighbouring elements sit next to each other in the block.
+    - insert/delete at the tail: O(1) amortized
+    - insert/delete at the head: O(block_size), the items of the head block are shifted (a list insert/pop at 0)
+    - indexed access: O(n / block_size) by walking blocks from the nearest end
+    - insert/delete by index: O(n / block_size + block_size), full blocks are split and half-empty blocks merged
+"""
+import time
+import tracemalloc
+from collections import deque
+from typing import Any, Iterator, List, Optional
+
+from DoublyLinkedList import DoublyLinkedList
+
+
+class Block:
+    """
+    Node of an unrolled linked list
+    """
+    __slots__ = ("items", "next", "prev")
+
+    def __init__(self, items: List[Any] = None):
+        self.items: List[Any] = items if items is not None else []
+        self.next: Optional[Block] = None
+        self.prev: Optional[Block] = None
+
+
+class UnrolledLinkedList:
+    """
+    An implementation of an unrolled doubly linked list
+    """
+    def __init__(self, block_size: int = 64):
+        if block_size < 2:
+            raise ValueError("block_size must be at least 2")
+        self.block_size = block_size
+        self.head: Optional[Block] = None
+        self.tail: Optional[Block] = None
+        self.length = 0
+
+    def __str__(self) -> str:
+        return " <-> ".join(["HEAD", *map(str, self), "TAIL"])
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[Any]:
+        block = self.head
+        while block:
+            yield from block.items
+            block = block.next
+
+    def __reversed__(self) -> Iterator[Any]:
+        block = self.tail
+        while block:
+            yield from reversed(block.items)
+            block = block.prev
+
+    def __getitem__(self, index: int) -> Any:
+        block, offset = self._locate(index)
+        return block.items[offset]
+
+    def __setitem__(self, index: int, data: Any) -> None:
+        block, offset = self._locate(index)
+        block.items[offset] = data
+
+    def is_empty(self) -> bool:
+        return self.length == 0
+
+    def _locate(self, index: int):
+        """
+        Finds the block holding the element at index, walking from the nearest end
+        :return: block and offset of the element inside the block
+        """
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("list index out of range")
+        if index < self.length // 2:
+            block = self.head
+            while index >= len(block.items):
+                index -= len(block.items)
+                block = block.next
+            return block, index
+        index = self.length - 1 - index
+        block = self.tail
+        while index >= len(block.items):
+            index -= len(block.items)
+            block = block.prev
+        return block, len(block.items) - 1 - index
+
+    # Block list machinery
+    def _link_after(self, block: Optional[Block], new_block: Block) -> None:
+        """
+        Links new_block after block, or as the first block when block is None
+        :return:
+        """
+        new_block.prev = block
+        new_block.next = block.next if block else self.head
+        if new_block.next:
+            new_block.next.prev = new_block
+        else:
+            self.tail = new_block
+        if block:
+            block.next = new_block
+        else:
+            self.head = new_block
+
+    def _unlink(self, block: Block) -> None:
+        if block.prev:
+            block.prev.next = block.next
+        else:
+            self.head = block.next
+        if block.next:
+            block.next.prev = block.prev
+        else:
+            self.tail = block.prev
+        block.next = None
+        block.prev = None
+
+    def split(self, block: Block) -> Block:
+        """
+        Moves the second half of the block into a new block linked right after it
+        :return: The new block
+        """
+        middle = len(block.items) // 2
+        new_block = Block(block.items[middle:])
+        del block.items[middle:]
+        self._link_after(block, new_block)
+        return new_block
+
+    def merge(self, block: Block) -> bool:
+        """
+        Moves the elements of the next block into this one if they fit, and unlinks the next block
+        :return: True if the blocks were merged
+        """
+        next_block = block.next
+        if next_block is None or len(block.items) + len(next_block.items) > self.block_size:
+            return False
+        block.items.extend(next_block.items)
+        self._unlink(next_block)
+        return True
+
+    def _rebalance(self, block: Block) -> None:
+        """
+        Called after a removal inside the list: drops empty blocks and merges a block
+        that fell under half full with a neighbour
+        :return:
+        """
+        if not block.items:
+            self._unlink(block)
+            return
+        if len(block.items) < self.block_size // 2:
+            if not self.merge(block) and block.prev:
+                self.merge(block.prev)
+
+    # Same operations as DoublyLinkedList
+    def insert_first(self, data: Any) -> None:
+        if self.head is None or len(self.head.items) >= self.block_size:
+            self._link_after(None, Block())
+        self.head.items.insert(0, data)
+        self.length += 1
+
+    def insert_last(self, data: Any) -> None:
+        if self.tail is None or len(self.tail.items) >= self.block_size:
+            self._link_after(self.tail, Block())
+        self.tail.items.append(data)
+        self.length += 1
+
+    def delete_first(self) -> Optional[Any]:
+        if self.head is None:
+            return None
+        block = self.head
+        data = block.items.pop(0)
+        if not block.items:
+            self._unlink(block)
+        self.length -= 1
+        return data
+
+    def delete_last(self) -> Optional[Any]:
+        if self.tail is None:
+            return None
+        block = self.tail
+        data = block.items.pop()
+        if not block.items:
+            self._unlink(block)
+        self.length -= 1
+        return data
+
+    def insert(self, index: int, data: Any) -> None:
+        """
+        Inserts data so that it ends up at the given index, a full block is split first
+        :return:
+        """
+        if index >= self.length:
+            self.insert_last(data)
+            return
+        if index <= 0:
+            self.insert_first(data)
+            return
+        block, offset = self._locate(index)
+        if len(block.items) >= self.block_size:
+            new_block = self.split(block)
+            if offset > len(block.items):
+                offset -= len(block.items)
+                block = new_block
+        block.items.insert(offset, data)
+        self.length += 1
+
+    def delete(self, index: int) -> Any:
+        """
+        Removes and returns the element at index, merging blocks which fall under half full
+        :return:
+        """
+        block, offset = self._locate(index)
+        data = block.items.pop(offset)
+        self.length -= 1
+        self._rebalance(block)
+        return data
+
+
+def benchmark(elements: int = 1000000) -> None:
+    """
+    Compares UnrolledLinkedList with DoublyLinkedList and collections.deque:
+    memory after 'elements' insert_last, time to push at both ends and pop everything
+    :return:
+    """
+    structures = [
+        ("DoublyLinkedList", DoublyLinkedList, "insert_first", "insert_last", "delete_first", "delete_last"),
+        ("UnrolledLinkedList", UnrolledLinkedList, "insert_first", "insert_last", "delete_first", "delete_last"),
+        ("deque", deque, "appendleft", "append", "popleft", "pop"),
+    ]
+    for name, factory, insert_first, insert_last, delete_first, delete_last in structures:
+        tracemalloc.start()
+        structure = factory()
+        push = getattr(structure, insert_last)
+        for i in range(elements):
+            push(i)
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del structure
+
+        structure = factory()
+        start = time.perf_counter()
+        push_first = getattr(structure, insert_first)
+        push_last = getattr(structure, insert_last)
+        for i in range(elements // 2):
+            push_first(i)
+            push_last(i)
+        pop_first = getattr(structure, delete_first)
+        pop_last = getattr(structure, delete_last)
+        for i in range(elements // 2):
+            pop_first()
+            pop_last()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<18} elements = {elements:,}, memory = {memory / 2 ** 20:,.1f} MiB, "
+              f"push + pop both ends = {elapsed:.2f}s")
+
+
+def test_insert_and_delete_both_ends():
+    test_list = UnrolledLinkedList(block_size=4)
+    for i in range(10):
+        test_list.insert_last(i)
+    for i in range(1, 6):
+        test_list.insert_first(-i)
+    assert list(test_list) == list(range(-5, 10))
+    assert list(reversed(test_list)) == list(range(9, -6, -1))
+    assert len(test_list) == 15
+    assert test_list.delete_first() == -5
+    assert test_list.delete_last() == 9
+    assert str(test_list) == "HEAD <-> -4 <-> -3 <-> -2 <-> -1 <-> 0 <-> 1 <-> 2 <-> 3 <-> 4 <-> 5 <-> 6 <-> 7 <-> 8 <-> TAIL"
+    while not test_list.is_empty():
+        test_list.delete_last()
+    assert test_list.delete_first() is None
+    assert test_list.delete_last() is None
+    assert test_list.head is None and test_list.tail is None
+    assert str(test_list) == "HEAD <-> TAIL"
+
+
+def test_indexed_access():
+    test_list = UnrolledLinkedList(block_size=3)
+    for i in range(20):
+        test_list.insert_last(i * 10)
+    assert [test_list[i] for i in range(20)] == [i * 10 for i in range(20)]
+    assert test_list[-1] == 190
+    test_list[7] = 7
+    assert test_list[7] == 7
+    try:
+        _ = test_list[20]
+        assert False, "IndexError expected"
+    except IndexError:
+        pass
+
+
+def test_insert_splits_and_delete_merges():
+    reference = []
+    test_list = UnrolledLinkedList(block_size=4)
+    for i in range(50):
+        index = (i * 7) % (len(reference) + 1)
+        reference.insert(index, i)
+        test_list.insert(index, i)
+        assert list(test_list) == reference
+    block = test_list.head
+    while block:
+        assert 0 < len(block.items) <= 4
+        block = block.next
+    deletes = 0
+    while reference:
+        index = (deletes * 5) % len(reference)
+        deletes += 1
+        assert test_list.delete(index) == reference.pop(index)
+        assert list(test_list) == reference
+        assert len(test_list) == len(reference)
+        block = test_list.head
+        while block:
+            assert 0 < len(block.items) <= 4
+            block = block.next
+    assert test_list.head is None and test_list.tail is None
+
+
+def test_split_and_merge():
+    test_list = UnrolledLinkedList(block_size=4)
+    for i in range(4):
+        test_list.insert_last(i)
+    new_block = test_list.split(test_list.head)
+    assert test_list.head.items == [0, 1] and new_block.items == [2, 3]
+    assert test_list.tail is new_block
+    assert test_list.merge(test_list.head)
+    assert test_list.head is test_list.tail and test_list.head.items == [0, 1, 2, 3]
+    assert not test_list.merge(test_list.head)
+
+
+if __name__ == "__main__":
+    print("Unrolled Linked List")
+    benchmark()
@@ -0,0 +1,352 @@
+"""
+AVL Tree: self-balancing binary search tree with order statistics
+Every node keeps the height and the size of its subtree:
+    - height keeps the tree balanced: the heights of the two children of a node differ by at most 1,
+      which bounds the height of the tree to ~1.44 log2(n)
+    - size answers rank/select queries in O(log n)
+Nodes are BinaryTree Nodes (value, left_child, right_child), the value being the key.
+"""
+import bisect
+import random
+import time
+from typing import Any, Iterable, Iterator, List, Optional
+
+from BinaryTree import Node, Stack, inorder_iter
+
+
+class AVLNode(Node):
+    """
+    Binary Tree Node with the height and size of its subtree
+    """
+
+    def __init__(self, data: Any):
+        super().__init__(data)
+        self.height: int = 1
+        self.size: int = 1
+
+
+def _height(node: Optional[AVLNode]) -> int:
+    return node.height if node else 0
+
+
+def _size(node: Optional[AVLNode]) -> int:
+    return node.size if node else 0
+
+
+def _update(node: AVLNode) -> None:
+    node.height = 1 + max(_height(node.left_child), _height(node.right_child))
+    node.size = 1 + _size(node.left_child) + _size(node.right_child)
+
+
+def _rotate_right(node: AVLNode) -> AVLNode:
+    pivot = node.left_child
+    node.left_child = pivot.right_child
+    pivot.right_child = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _rotate_left(node: AVLNode) -> AVLNode:
+    pivot = node.right_child
+    node.right_child = pivot.left_child
+    pivot.left_child = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _rebalance(node: AVLNode) -> AVLNode:
+    """
+    Updates the node and restores the AVL property with at most two rotations
+    :return: New root of the subtree
+    """
+    _update(node)
+    balance = _height(node.left_child) - _height(node.right_child)
+    if balance > 1:
+        if _height(node.left_child.left_child) < _height(node.left_child.right_child):
+            node.left_child = _rotate_left(node.left_child)
+        return _rotate_right(node)
+    if balance < -1:
+        if _height(node.right_child.right_child) < _height(node.right_child.left_child):
+            node.right_child = _rotate_right(node.right_child)
+        return _rotate_left(node)
+    return node
+
+
+class AVLTree:
+    """
+    An implementation of an AVL Tree holding unique keys
+    insert, delete, search, rank and select are performed in O(log n) time
+    """
+
+    def __init__(self):
+        self.root: Optional[AVLNode] = None
+
+    def __len__(self) -> int:
+        return _size(self.root)
+
+    def __iter__(self) -> Iterator[Any]:
+        return inorder_iter(self.root)
+
+    def __contains__(self, key: Any) -> bool:
+        return self.search(key) is not None
+
+    @classmethod
+    def from_sorted(cls, keys: Iterable[Any]) -> "AVLTree":
+        """
+        Bulk-load from keys in ascending order, duplicates are skipped
+        The middle key becomes the root and both halves are built the same way
+        Time Complexity = O(n)
+        :param keys:
+        :return:
+        """
+        unique: List[Any] = []
+        for key in keys:
+            if unique and not unique[-1] < key:
+                if unique[-1] == key:
+                    continue
+                raise ValueError("keys must be sorted in ascending order")
+            unique.append(key)
+
+        def build(low: int, high: int) -> Optional[AVLNode]:
+            if low >= high:
+                return None
+            middle = (low + high) // 2
+            node = AVLNode(unique[middle])
+            node.left_child = build(low, middle)
+            node.right_child = build(middle + 1, high)
+            _update(node)
+            return node
+
+        tree = cls()
+        tree.root = build(0, len(unique))
+        return tree
+
+    def search(self, key: Any) -> Optional[AVLNode]:
+        current = self.root
+        while current:
+            if key < current.value:
+                current = current.left_child
+            elif current.value < key:
+                current = current.right_child
+            else:
+                return current
+        return None
+
+    def insert(self, key: Any) -> bool:
+        """
+        Inserts the key
+        :return: True if inserted, False if it was already present
+        """
+        size = len(self)
+        self.root = self._insert(self.root, key)
+        return len(self) > size
+
+    def _insert(self, node: Optional[AVLNode], key: Any) -> AVLNode:
+        if node is None:
+            return AVLNode(key)
+        if key < node.value:
+            node.left_child = self._insert(node.left_child, key)
+        elif node.value < key:
+            node.right_child = self._insert(node.right_child, key)
+        else:
+            return node
+        return _rebalance(node)
+
+    def delete(self, key: Any) -> bool:
+        """
+        Deletes the key
+        :return: True if deleted, False if it was not present
+        """
+        size = len(self)
+        self.root = self._delete(self.root, key)
+        return len(self) < size
+
+    def _delete(self, node: Optional[AVLNode], key: Any) -> Optional[AVLNode]:
+        if node is None:
+            return None
+        if key < node.value:
+            node.left_child = self._delete(node.left_child, key)
+        elif node.value < key:
+            node.right_child = self._delete(node.right_child, key)
+        else:
+            if node.left_child is None:
+                return node.right_child
+            if node.right_child is None:
+                return node.left_child
+            # Two children: replace by the in order successor and delete it from the right subtree
+            successor = node.right_child
+            while successor.left_child:
+                successor = successor.left_child
+            node.value = successor.value
+            node.right_child = self._delete(node.right_child, successor.value)
+        return _rebalance(node)
+
+    def rank(self, key: Any) -> int:
+        """
+        Number of keys strictly smaller than key
+        :return:
+        """
+        rank = 0
+        current = self.root
+        while current:
+            if key <= current.value:
+                current = current.left_child
+            else:
+                rank += _size(current.left_child) + 1
+                current = current.right_child
+        return rank
+
+    def select(self, index: int) -> Any:
+        """
+        Returns the key at the given position in sorted order (0 is the smallest)
+        :return:
+        """
+        if not 0 <= index < len(self):
+            raise IndexError("index out of range")
+        current = self.root
+        while True:
+            left_size = _size(current.left_child)
+            if index < left_size:
+                current = current.left_child
+            elif index == left_size:
+                return current.value
+            else:
+                index -= left_size + 1
+                current = current.right_child
+
+    def range(self, low: Any, high: Any) -> Iterator[Any]:
+        """
+        Yields the keys k with low <= k < high in ascending order
+        In order traversal with a stack, subtrees entirely outside the range are not visited
+        Time Complexity = O(log n + number of yielded keys)
+        :return:
+        """
+        stack = Stack()
+        current = self.root
+        while True:
+            if current:
+                if current.value < low:
+                    # Everything on the left is smaller too
+                    current = current.right_child
+                else:
+                    stack.push(current)
+                    current = current.left_child
+            elif not stack.is_empty():
+                current = stack.pop()
+                if not current.value < high:
+                    return
+                yield current.value
+                current = current.right_child
+            else:
+                return
+
+
+def benchmark(size: int = 200000) -> None:
+    """
+    Compares inserting random keys in an AVLTree with keeping a sorted list (bisect.insort)
+    :return:
+    """
+    keys = random.Random(6).sample(range(size * 10), size)
+    tree = AVLTree()
+    start = time.perf_counter()
+    for key in keys:
+        tree.insert(key)
+    tree_elapsed = time.perf_counter() - start
+    sorted_list: List[int] = []
+    start = time.perf_counter()
+    for key in keys:
+        bisect.insort(sorted_list, key)
+    list_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    AVLTree.from_sorted(sorted_list)
+    bulk_elapsed = time.perf_counter() - start
+    print(f"keys = {size:,}, AVLTree.insert = {tree_elapsed:.2f}s, bisect.insort = {list_elapsed:.2f}s, "
+          f"AVLTree.from_sorted = {bulk_elapsed:.2f}s, height = {tree.root.height}")
+
+
+def _check(node: Optional[AVLNode]) -> None:
+    if node is None:
+        return
+    _check(node.left_child)
+    _check(node.right_child)
+    assert node.height == 1 + max(_height(node.left_child), _height(node.right_child))
+    assert node.size == 1 + _size(node.left_child) + _size(node.right_child)
+    assert abs(_height(node.left_child) - _height(node.right_child)) <= 1
+
+
+def test_insert_delete_search():
+    rng = random.Random(1)
+    tree = AVLTree()
+    reference = set()
+    for _ in range(3000):
+        key = rng.randrange(500)
+        if rng.random() < 0.6:
+            assert tree.insert(key) == (key not in reference)
+            reference.add(key)
+        else:
+            assert tree.delete(key) == (key in reference)
+            reference.discard(key)
+        assert (key in tree) == (key in reference)
+    _check(tree.root)
+    assert list(tree) == sorted(reference)
+    assert len(tree) == len(reference)
+
+
+def test_sorted_inserts_stay_balanced():
+    tree = AVLTree()
+    for key in range(1023):
+        tree.insert(key)
+    _check(tree.root)
+    assert tree.root.height == 10
+
+
+def test_rank_and_select():
+    keys = list(range(0, 200, 2))
+    tree = AVLTree()
+    for key in random.Random(2).sample(keys, len(keys)):
+        tree.insert(key)
+    for index, key in enumerate(keys):
+        assert tree.select(index) == key
+        assert tree.rank(key) == index
+        assert tree.rank(key + 1) == index + 1
+    assert tree.rank(-5) == 0
+    try:
+        tree.select(len(keys))
+        assert False, "IndexError expected"
+    except IndexError:
+        pass
+
+
+def test_range():
+    tree = AVLTree.from_sorted(range(0, 100, 3))
+    assert list(tree.range(10, 30)) == [12, 15, 18, 21, 24, 27]
+    assert list(tree.range(-10, 4)) == [0, 3]
+    assert list(tree.range(98, 200)) == [99]
+    assert list(tree.range(50, 50)) == []
+    assert list(AVLTree().range(0, 10)) == []
+
+
+def test_from_sorted():
+    tree = AVLTree.from_sorted([1, 2, 2, 3, 5, 8, 13])
+    _check(tree.root)
+    assert list(tree) == [1, 2, 3, 5, 8, 13]
+    assert tree.select(3) == 5
+    tree.insert(4)
+    tree.delete(13)
+    _check(tree.root)
+    assert list(tree) == [1, 2, 3, 4, 5, 8]
+    big = AVLTree.from_sorted(range(100000))
+    _check(big.root)
+    assert big.root.height == 17
+    try:
+        AVLTree.from_sorted([3, 1])
+        assert False, "ValueError expected"
+    except ValueError:
+        pass
+
+
+if __name__ == '__main__':
+    print("AVL Tree")
+    benchmark()
@@ -1,4 +1,8 @@
-from typing import Any, List
+import contextlib
+import os
+import time
+from collections import deque
+from typing import Any, Iterator, List, Optional
 
 
 class Stack:
@@ -44,13 +48,14 @@ class Stack:
 class Queue:
     """
     Basic implementation of a Queue data structure with minimal methods as required for Tree algorithms
+    Underlying data structure is a collections.deque, both enqueue and dequeue are O(1)
     """
 
     def __init__(self):
         """
         Constructor: create an instance of Queue
         """
-        self.list = list()
+        self.list: deque = deque()
 
     def enqueue(self, data: Any) -> None:
         """
@@ -58,14 +63,15 @@ class Queue:
         :param data:
         :return:
         """
-        self.list.insert(0, data)
+        self.list.append(data)
 
     def dequeue(self) -> Any:
         """
         Removes and returns the object on the front of the queue
+        Warning: when the queue is empty it will raise IndexError
         :return:
         """
-        return self.list.pop()
+        return self.list.popleft()
 
     def is_empty(self) -> bool:
         return len(self.list) == 0
@@ -146,6 +152,25 @@ def bfs(root_node: Node) -> None:
     print()
 
 
+def bfs_levels(root_node: Node) -> Iterator[List[Any]]:
+    """
+    Level aware Breadth first search: yields the values of one whole level at a time
+    Each level is built from the list of nodes of the previous one, no per-node queue operations
+    :param root_node:
+    :return:
+    """
+    level = [root_node] if root_node else []
+    while level:
+        yield [node.value for node in level]
+        next_level = []
+        for node in level:
+            if node.left_child:
+                next_level.append(node.left_child)
+            if node.right_child:
+                next_level.append(node.right_child)
+        level = next_level
+
+
 def dfs(root_node: Node) -> None:
     """
     Depth first search
@@ -220,6 +245,331 @@ def tree_max_sum_path(root_node: Node) -> int:
     return root_node.value + max(tree_max_sum_path(root_node.left_child), tree_max_sum_path(root_node.right_child))
 
 
+def preorder_iter(root_node: Node) -> Iterator[Any]:
+    """
+    Pre Order traversal as a generator, values are yielded lazily
+    Uses an explicit stack, so the depth of the tree is not limited by the recursion limit
+    :param root_node:
+    :return:
+    """
+    if root_node is None:
+        return
+    stack = Stack()
+    stack.push(root_node)
+    while not stack.is_empty():
+        current = stack.pop()
+        yield current.value
+        if current.right_child:
+            stack.push(current.right_child)
+        if current.left_child:
+            stack.push(current.left_child)
+
+
+def inorder_iter(root_node: Node) -> Iterator[Any]:
+    """
+    In Order traversal as a generator, values are yielded lazily
+    :param root_node:
+    :return:
+    """
+    stack = Stack()
+    current = root_node
+    while True:
+        if current:
+            stack.push(current)
+            current = current.left_child
+        elif not stack.is_empty():
+            current = stack.pop()
+            yield current.value
+            current = current.right_child
+        else:
+            break
+
+
+def postorder_iter(root_node: Node) -> Iterator[Any]:
+    """
+    Post Order traversal as a generator, values are yielded lazily
+    A node is yielded when we come back to it from its right subtree (or it has none)
+    :param root_node:
+    :return:
+    """
+    stack = Stack()
+    current = root_node
+    last_visited: Optional[Node] = None
+    while current or not stack.is_empty():
+        if current:
+            stack.push(current)
+            current = current.left_child
+            continue
+        top = stack.peek()
+        if top.right_child and top.right_child is not last_visited:
+            current = top.right_child
+        else:
+            yield top.value
+            last_visited = stack.pop()
+
+
+def level_order_iter(root_node: Node) -> Iterator[Any]:
+    """
+    Level Order traversal (BFS) as a generator, values are yielded lazily
+    :param root_node:
+    :return:
+    """
+    if root_node is None:
+        return
+    queue = Queue()
+    queue.enqueue(root_node)
+    while not queue.is_empty():
+        current = queue.dequeue()
+        yield current.value
+        if current.left_child:
+            queue.enqueue(current.left_child)
+        if current.right_child:
+            queue.enqueue(current.right_child)
+
+
+def morris_inorder(root_node: Node) -> Iterator[Any]:
+    """
+    Morris In Order traversal: O(1) extra space, no stack
+    Before going down a left subtree, the rightmost node of that subtree is temporarily threaded
+    back to the current node, and the thread is removed on the way back.
+    The tree is restored when the generator is exhausted or closed early (break, close() or an exception
+    in the consumer). Do not modify the tree while iterating.
+    Time Complexity = O(n)
+    Space Complexity = O(1)
+    :param root_node:
+    :return:
+    """
+    current = root_node
+    try:
+        while current:
+            if current.left_child is None:
+                yield current.value
+                current = current.right_child
+                continue
+            predecessor = current.left_child
+            while predecessor.right_child and predecessor.right_child is not current:
+                predecessor = predecessor.right_child
+            if predecessor.right_child is None:
+                # Thread the predecessor back to the current node and go left
+                predecessor.right_child = current
+                current = current.left_child
+            else:
+                # Left subtree done, remove the thread
+                predecessor.right_child = None
+                yield current.value
+                current = current.right_child
+    finally:
+        _remove_threads(current)
+
+
+def _remove_threads(current: Optional[Node]) -> None:
+    """
+    Removes the threads left by a Morris traversal stopped at 'current'
+    The threaded nodes are the ancestors whose left subtree holds 'current', following the right children
+    from 'current' reaches each of them through its thread.
+    :return:
+    """
+    while current:
+        if current.left_child:
+            predecessor = current.left_child
+            while predecessor.right_child and predecessor.right_child is not current:
+                predecessor = predecessor.right_child
+            if predecessor.right_child is current:
+                predecessor.right_child = None
+        current = current.right_child
+
+
+def tree_sum_iter(root_node: Node) -> int:
+    """
+    Non-recursive tree_sum
+    :param root_node:
+    :return:
+    """
+    return sum(preorder_iter(root_node))
+
+
+def tree_min_iter(root_node: Node) -> Optional[Any]:
+    """
+    Non-recursive tree_min, None for an empty tree
+    :param root_node:
+    :return:
+    """
+    return min(preorder_iter(root_node), default=None)
+
+
+def tree_max_sum_path_iter(root_node: Node) -> int:
+    """
+    Non-recursive tree_max_sum_path: maximum sum of the values on a root to leaf path
+    Walks the tree depth first carrying the sum of the path down to every node
+    :param root_node:
+    :return:
+    """
+    if root_node is None:
+        return -1000000
+    best = None
+    stack = Stack()
+    stack.push((root_node, root_node.value))
+    while not stack.is_empty():
+        current, path_sum = stack.pop()
+        if current.left_child is None and current.right_child is None:
+            # This is a leaf node
+            if best is None or path_sum > best:
+                best = path_sum
+            continue
+        if current.right_child:
+            stack.push((current.right_child, path_sum + current.right_child.value))
+        if current.left_child:
+            stack.push((current.left_child, path_sum + current.left_child.value))
+    return best
+
+
+def complete_tree(size: int) -> Optional[Node]:
+    """
+    Builds a complete binary tree of 'size' nodes with values 0 to size - 1 in level order
+    :param size:
+    :return: Root Node
+    """
+    nodes = [Node(i) for i in range(size)]
+    for i in range(size // 2):
+        left = 2 * i + 1
+        if left < size:
+            nodes[i].left_child = nodes[left]
+        if left + 1 < size:
+            nodes[i].right_child = nodes[left + 1]
+    return nodes[0] if nodes else None
+
+
+def benchmark_bfs(sizes: List[int] = None) -> None:
+    """
+    Times bfs (output sent to os.devnull), level_order_iter and bfs_levels on complete trees
+    The time per node should stay flat as the size grows, i.e. linear scaling
+    :return:
+    """
+    if sizes is None:
+        sizes = [10 ** 5, 10 ** 6, 10 ** 7]
+    for size in sizes:
+        root_node = complete_tree(size)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            bfs(root_node)
+            bfs_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in level_order_iter(root_node):
+            pass
+        iter_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in bfs_levels(root_node):
+            pass
+        levels_elapsed = time.perf_counter() - start
+        print(f"nodes = {size:>12,}, bfs = {bfs_elapsed:.2f}s ({bfs_elapsed / size * 1e9:.0f} ns/node), "
+              f"level_order_iter = {iter_elapsed:.2f}s ({iter_elapsed / size * 1e9:.0f} ns/node), "
+              f"bfs_levels = {levels_elapsed:.2f}s ({levels_elapsed / size * 1e9:.0f} ns/node)")
+        del root_node
+
+
+def sample_tree() -> Node:
+    """
+    Small tree shared by the tests of the Tree modules, values in level order: 1, 2, 3, 4, 5, -6, 7
+    (7 is the left child of 5, -6 the right child of 3)
+    :return: root node
+    """
+    root_node = Node(1)
+    root_node.left_child = Node(2)
+    root_node.right_child = Node(3)
+    root_node.left_child.left_child = Node(4)
+    root_node.left_child.right_child = Node(5)
+    root_node.right_child.right_child = Node(-6)
+    root_node.left_child.right_child.left_child = Node(7)
+    return root_node
+
+
+def _degenerate_tree(depth: int, left: bool = True) -> Node:
+    root_node = Node(0)
+    current = root_node
+    for i in range(1, depth):
+        child = Node(i)
+        if left or i % 2:
+            current.left_child = child
+        else:
+            current.right_child = child
+        current = child
+    return root_node
+
+
+def test_traversal_generators():
+    root_node = sample_tree()
+    assert list(preorder_iter(root_node)) == [1, 2, 4, 5, 7, 3, -6]
+    assert list(inorder_iter(root_node)) == [4, 2, 7, 5, 1, 3, -6]
+    assert list(postorder_iter(root_node)) == [4, 7, 5, 2, -6, 3, 1]
+    assert list(level_order_iter(root_node)) == [1, 2, 3, 4, 5, -6, 7]
+    assert list(morris_inorder(root_node)) == [4, 2, 7, 5, 1, 3, -6]
+    # Morris traversal leaves the tree as it was
+    assert list(inorder_iter(root_node)) == [4, 2, 7, 5, 1, 3, -6]
+    for traversal in (preorder_iter, inorder_iter, postorder_iter, level_order_iter, morris_inorder):
+        assert list(traversal(None)) == []
+
+
+def test_morris_inorder_closed_early():
+    expected = [4, 2, 7, 5, 1, 3, -6]
+    for consumed in range(len(expected)):
+        root_node = sample_tree()
+        generator = morris_inorder(root_node)
+        assert [next(generator) for _ in range(consumed + 1)] == expected[:consumed + 1]
+        generator.close()
+        assert list(preorder_iter(root_node)) == [1, 2, 4, 5, 7, 3, -6]
+        assert list(morris_inorder(root_node)) == expected
+    root_node = complete_tree(1000)
+    for value in morris_inorder(root_node):
+        if value == 500:
+            break
+    assert list(inorder_iter(root_node)) == list(inorder_iter(complete_tree(1000)))
+
+
+def test_queue_is_fifo():
+    queue = Queue()
+    for i in range(5):
+        queue.enqueue(i)
+    assert [queue.dequeue() for _ in range(3)] == [0, 1, 2]
+    queue.enqueue(5)
+    assert [queue.dequeue() for _ in range(3)] == [3, 4, 5]
+    assert queue.is_empty()
+
+
+def test_bfs_levels():
+    assert list(bfs_levels(sample_tree())) == [[1], [2, 3], [4, 5, -6], [7]]
+    assert list(bfs_levels(None)) == []
+    assert list(bfs_levels(complete_tree(6))) == [[0], [1, 2], [3, 4, 5]]
+    assert list(level_order_iter(complete_tree(100))) == list(range(100))
+
+
+def test_traversal_generators_are_lazy():
+    generator = inorder_iter(_degenerate_tree(10))
+    assert next(generator) == 9
+    assert next(generator) == 8
+
+
+def test_iterative_aggregates():
+    root_node = sample_tree()
+    assert tree_sum_iter(root_node) == tree_sum(root_node) == 16
+    assert tree_min_iter(root_node) == -6
+    assert tree_max_sum_path_iter(root_node) == tree_max_sum_path(root_node) == 15
+    assert tree_sum_iter(None) == 0
+    assert tree_min_iter(None) is None
+    assert tree_max_sum_path_iter(None) == tree_max_sum_path(None)
+
+
+def test_deep_tree_does_not_hit_recursion_limit():
+    depth = 100000
+    for left in (True, False):
+        root_node = _degenerate_tree(depth, left)
+        assert tree_sum_iter(root_node) == depth * (depth - 1) // 2
+        assert tree_min_iter(root_node) == 0
+        assert tree_max_sum_path_iter(root_node) == depth * (depth - 1) // 2
+        assert sum(1 for _ in postorder_iter(root_node)) == depth
+        assert sum(1 for _ in morris_inorder(root_node)) == depth
+        assert sum(1 for _ in inorder_iter(root_node)) == depth
+
+
 if __name__ == '__main__':
     # Create a node with some data
     root: Node = Node(1)
@@ -234,4 +584,9 @@ if __name__ == '__main__':
     dfs_recursive(root)
     print(f"tree_sum: actual = {tree_sum(root)}, expected = 15")
     print(f"tree_min: actual = {tree_min(root)}, expected = 1")
+    print(f"inorder_iter: {list(inorder_iter(root))}")
+    print(f"morris_inorder: {list(morris_inorder(root))}")
+    print(f"level_order_iter: {list(level_order_iter(root))}")
+    print(f"bfs_levels: {list(bfs_levels(root))}")
+    # benchmark_bfs()
     # print('PyCharm')
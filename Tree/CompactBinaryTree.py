@@ -0,0 +1,238 @@
+"""
+Array backed (compact) binary tree
+Instead of one Node object per value, the tree is three parallel typed arrays:
+    values[i]         -> value of node i
+    left[i], right[i] -> index of the children of node i, NIL (-1) when there is none
+Nodes are numbered in level order, so node 0 is the root and every child has a larger index than its parent.
+That makes bottom-up aggregates a single reverse scan of the arrays, without recursion.
+"""
+import time
+import tracemalloc
+from array import array
+from typing import Any, Iterator, Optional
+
+from BinaryTree import Node, sample_tree, complete_tree, tree_max_sum_path_iter, tree_min_iter, tree_sum_iter
+
+NIL = -1
+
+
+class CompactBinaryTree:
+    """
+    Binary tree stored in parallel typed arrays
+    """
+    def __init__(self, typecode: str = "q"):
+        """
+        :param typecode: array typecode of the values, e.g. "q" for 64-bit ints or "d" for floats
+        """
+        self.values = array(typecode)
+        self.left = array("q")
+        self.right = array("q")
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @classmethod
+    def from_nodes(cls, root_node: Optional[Node], typecode: str = "q") -> "CompactBinaryTree":
+        """
+        Converts a Node tree, numbering the nodes in level order
+        :param root_node:
+        :param typecode:
+        :return:
+        """
+        tree = cls(typecode)
+        if root_node is None:
+            return tree
+        values, left, right = tree.values, tree.left, tree.right
+        level = [root_node]
+        next_index = 1
+        while level:
+            next_level = []
+            for node in level:
+                values.append(node.value)
+                if node.left_child:
+                    left.append(next_index)
+                    next_index += 1
+                    next_level.append(node.left_child)
+                else:
+                    left.append(NIL)
+                if node.right_child:
+                    right.append(next_index)
+                    next_index += 1
+                    next_level.append(node.right_child)
+                else:
+                    right.append(NIL)
+            level = next_level
+        return tree
+
+    def to_nodes(self) -> Optional[Node]:
+        """
+        Converts back to a Node tree
+        :return: Root Node
+        """
+        nodes = [Node(value) for value in self.values]
+        for i, node in enumerate(nodes):
+            if self.left[i] != NIL:
+                node.left_child = nodes[self.left[i]]
+            if self.right[i] != NIL:
+                node.right_child = nodes[self.right[i]]
+        return nodes[0] if nodes else None
+
+    # Traversals
+    def preorder(self) -> Iterator[Any]:
+        if not self.values:
+            return
+        values, left, right = self.values, self.left, self.right
+        stack = [0]
+        while stack:
+            current = stack.pop()
+            yield values[current]
+            if right[current] != NIL:
+                stack.append(right[current])
+            if left[current] != NIL:
+                stack.append(left[current])
+
+    def inorder(self) -> Iterator[Any]:
+        values, left, right = self.values, self.left, self.right
+        stack = []
+        current = 0 if values else NIL
+        while True:
+            if current != NIL:
+                stack.append(current)
+                current = left[current]
+            elif stack:
+                current = stack.pop()
+                yield values[current]
+                current = right[current]
+            else:
+                break
+
+    def postorder(self) -> Iterator[Any]:
+        values, left, right = self.values, self.left, self.right
+        stack = []
+        current = 0 if values else NIL
+        last_visited = NIL
+        while current != NIL or stack:
+            if current != NIL:
+                stack.append(current)
+                current = left[current]
+                continue
+            top = stack[-1]
+            if right[top] != NIL and right[top] != last_visited:
+                current = right[top]
+            else:
+                yield values[top]
+                last_visited = stack.pop()
+
+    def level_order(self) -> Iterator[Any]:
+        # Level order is the storage order
+        return iter(self.values)
+
+    # Aggregates
+    def tree_sum(self) -> Any:
+        return sum(self.values)
+
+    def tree_min(self) -> Optional[Any]:
+        return min(self.values, default=None)
+
+    def tree_max_sum_path(self) -> Any:
+        """
+        Maximum sum of the values on a root to leaf path
+        Children come after their parent, so a reverse scan sees every child before its parent
+        :return:
+        """
+        values, left, right = self.values, self.left, self.right
+        if not values:
+            return -1000000
+        best = list(values)
+        for i in range(len(values) - 1, -1, -1):
+            left_child, right_child = left[i], right[i]
+            if left_child != NIL and right_child != NIL:
+                best[i] += max(best[left_child], best[right_child])
+            elif left_child != NIL:
+                best[i] += best[left_child]
+            elif right_child != NIL:
+                best[i] += best[right_child]
+        return best[0]
+
+
+def benchmark(size: int = 1000000) -> None:
+    """
+    Memory (tracemalloc) and aggregate time of a complete tree of 'size' nodes, Node based vs compact
+    :return:
+    """
+    tracemalloc.start()
+    root_node = complete_tree(size)
+    node_memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tracemalloc.start()
+    tree = CompactBinaryTree.from_nodes(root_node)
+    compact_memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"nodes = {size:,}, Node tree = {node_memory / 2 ** 20:,.1f} MiB, "
+          f"compact tree = {compact_memory / 2 ** 20:,.1f} MiB")
+    for name, node_function, compact_function in [
+        ("tree_sum", tree_sum_iter, tree.tree_sum),
+        ("tree_min", tree_min_iter, tree.tree_min),
+        ("tree_max_sum_path", tree_max_sum_path_iter, tree.tree_max_sum_path),
+    ]:
+        start = time.perf_counter()
+        node_function(root_node)
+        node_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        compact_function()
+        compact_elapsed = time.perf_counter() - start
+        print(f"{name:<17} Node = {node_elapsed:.3f}s, compact = {compact_elapsed:.3f}s")
+
+
+def test_round_trip():
+    tree = CompactBinaryTree.from_nodes(sample_tree())
+    assert list(tree.values) == [1, 2, 3, 4, 5, -6, 7]
+    assert list(tree.left) == [1, 3, NIL, NIL, 6, NIL, NIL]
+    assert list(tree.right) == [2, 4, 5, NIL, NIL, NIL, NIL]
+    root_node = tree.to_nodes()
+    assert root_node.left_child.right_child.left_child.value == 7
+    assert root_node.right_child.left_child is None
+    assert list(CompactBinaryTree.from_nodes(root_node).values) == list(tree.values)
+    empty = CompactBinaryTree.from_nodes(None)
+    assert len(empty) == 0 and empty.to_nodes() is None
+
+
+def test_traversals():
+    tree = CompactBinaryTree.from_nodes(sample_tree())
+    assert list(tree.preorder()) == [1, 2, 4, 5, 7, 3, -6]
+    assert list(tree.inorder()) == [4, 2, 7, 5, 1, 3, -6]
+    assert list(tree.postorder()) == [4, 7, 5, 2, -6, 3, 1]
+    assert list(tree.level_order()) == [1, 2, 3, 4, 5, -6, 7]
+    empty = CompactBinaryTree()
+    assert list(empty.preorder()) == list(empty.inorder()) == list(empty.postorder()) == []
+
+
+def test_aggregates():
+    root_node = sample_tree()
+    tree = CompactBinaryTree.from_nodes(root_node)
+    assert tree.tree_sum() == tree_sum_iter(root_node) == 16
+    assert tree.tree_min() == -6
+    assert tree.tree_max_sum_path() == tree_max_sum_path_iter(root_node) == 15
+    empty = CompactBinaryTree()
+    assert empty.tree_sum() == 0
+    assert empty.tree_min() is None
+    assert empty.tree_max_sum_path() == -1000000
+    floats = CompactBinaryTree.from_nodes(root_node, typecode="d")
+    assert floats.tree_sum() == 16.0
+
+
+def test_deep_tree():
+    root_node = Node(0)
+    current = root_node
+    for i in range(1, 50000):
+        current.right_child = Node(i)
+        current = current.right_child
+    tree = CompactBinaryTree.from_nodes(root_node)
+    assert tree.tree_max_sum_path() == sum(range(50000))
+    assert list(tree.inorder()) == list(range(50000))
+    assert sum(1 for _ in tree.postorder()) == 50000
+
+
+if __name__ == '__main__':
+    print("Compact (array backed) Binary Tree")
+    benchmark()
@@ -0,0 +1,182 @@
+"""
+NumPy aggregates over a CompactBinaryTree
+In a CompactBinaryTree nodes are numbered in level order, so every level is a contiguous range of indexes
+and all the children of a level form the next range. Aggregates of every subtree are computed bottom-up,
+one vectorized step per level, instead of one Python call per node:
+    sums[i]          -> sum of the values in the subtree of node i
+    mins[i]          -> minimum value in the subtree of node i
+    max_path_sums[i] -> maximum sum of the values on a path from node i down to a leaf
+    heights[i]       -> number of edges on the longest path from node i down to a leaf
+The number of NumPy operations is proportional to the height of the tree, which suits balanced trees.
+Requires NumPy, the module still imports without it so that the Tree tests can be collected.
+"""
+import time
+from typing import List, NamedTuple, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # subtree_aggregates and its tests need NumPy
+    np = None
+
+from BinaryTree import sample_tree, complete_tree, tree_max_sum_path, tree_min, tree_sum
+from CompactBinaryTree import NIL, CompactBinaryTree
+
+
+class SubtreeAggregates(NamedTuple):
+    sums: "np.ndarray"
+    mins: "np.ndarray"
+    max_path_sums: "np.ndarray"
+    heights: "np.ndarray"
+
+
+def level_bounds(tree: CompactBinaryTree) -> List[int]:
+    """
+    Returns the boundaries of the levels: level k holds the nodes bounds[k] to bounds[k + 1] - 1
+    :param tree:
+    :return:
+    """
+    if np is None:
+        raise ImportError("level_bounds requires NumPy")
+    if len(tree) == 0:
+        return [0]
+    left = np.frombuffer(tree.left, dtype=np.int64)
+    right = np.frombuffer(tree.right, dtype=np.int64)
+    bounds = [0, 1]
+    start, end = 0, 1
+    while True:
+        children = int(np.count_nonzero(left[start:end] != NIL)) + int(np.count_nonzero(right[start:end] != NIL))
+        if children == 0:
+            break
+        start, end = end, end + children
+        bounds.append(end)
+    return bounds
+
+
+def _limits(dtype: "np.dtype") -> Tuple:
+    """
+    Highest and lowest values of the dtype, used for the missing children
+    :return:
+    """
+    if np.issubdtype(dtype, np.floating):
+        return np.inf, -np.inf
+    info = np.iinfo(dtype)
+    return info.max, info.min
+
+
+def subtree_aggregates(tree: CompactBinaryTree) -> SubtreeAggregates:
+    """
+    Computes sums, mins, max root to leaf path sums and heights of every subtree in one bottom-up pass
+    Time Complexity = O(n) work in O(height) vectorized steps
+    Space Complexity = O(n)
+    :param tree:
+    :return:
+    """
+    if np is None:
+        raise ImportError("subtree_aggregates requires NumPy")
+    n = len(tree)
+    if n == 0:
+        empty = np.zeros(0, dtype=tree.values.typecode)
+        return SubtreeAggregates(empty, empty.copy(), empty.copy(), np.zeros(0, dtype=np.int64))
+    values = np.frombuffer(tree.values, dtype=tree.values.typecode)
+    left = np.frombuffer(tree.left, dtype=np.int64)
+    right = np.frombuffer(tree.right, dtype=np.int64)
+    has_child = (left != NIL) | (right != NIL)
+    # Missing children point to an extra padding slot at index n holding a neutral value
+    left_index = np.where(left == NIL, n, left)
+    right_index = np.where(right == NIL, n, right)
+    highest, lowest = _limits(values.dtype)
+    sums = np.zeros(n + 1, dtype=values.dtype)
+    mins = np.empty(n + 1, dtype=values.dtype)
+    mins[n] = highest
+    paths = np.empty(n + 1, dtype=values.dtype)
+    paths[n] = lowest
+    heights = np.empty(n + 1, dtype=np.int64)
+    heights[n] = -1
+    bounds = level_bounds(tree)
+    for start, end in reversed(list(zip(bounds, bounds[1:]))):
+        level_values = values[start:end]
+        level_left = left_index[start:end]
+        level_right = right_index[start:end]
+        sums[start:end] = level_values + sums[level_left] + sums[level_right]
+        mins[start:end] = np.minimum(level_values, np.minimum(mins[level_left], mins[level_right]))
+        best_child = np.maximum(paths[level_left], paths[level_right])
+        # Leaves have no child path, add 0 instead of the padding value to avoid an overflow
+        paths[start:end] = level_values + np.where(has_child[start:end], best_child, 0)
+        heights[start:end] = 1 + np.maximum(heights[level_left], heights[level_right])
+    return SubtreeAggregates(sums[:n], mins[:n], paths[:n], heights[:n])
+
+
+def benchmark(sizes: List[int] = None) -> None:
+    """
+    Compares the recursive tree_sum, tree_min and tree_max_sum_path with one subtree_aggregates pass
+    on complete trees (which also computes the aggregates of every subtree, and the heights)
+    :return:
+    """
+    if sizes is None:
+        sizes = [10 ** 6, 10 ** 7]
+    for size in sizes:
+        root_node = complete_tree(size)
+        tree = CompactBinaryTree.from_nodes(root_node)
+        start = time.perf_counter()
+        tree_sum(root_node)
+        tree_min(root_node)
+        tree_max_sum_path(root_node)
+        recursive_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        subtree_aggregates(tree)
+        vectorized_elapsed = time.perf_counter() - start
+        print(f"nodes = {size:>12,}, recursive = {recursive_elapsed:.2f}s, vectorized = {vectorized_elapsed:.2f}s, "
+              f"speedup = {recursive_elapsed / vectorized_elapsed:.1f}x")
+        del root_node, tree
+
+
+def _require_numpy() -> None:
+    """
+    Skips the calling test when NumPy is not installed
+    """
+    import pytest
+    pytest.importorskip("numpy")
+
+
+def test_level_bounds():
+    _require_numpy()
+    assert level_bounds(CompactBinaryTree.from_nodes(sample_tree())) == [0, 1, 3, 6, 7]
+    assert level_bounds(CompactBinaryTree()) == [0]
+
+
+def test_subtree_aggregates():
+    _require_numpy()
+    root_node = sample_tree()
+    aggregates = subtree_aggregates(CompactBinaryTree.from_nodes(root_node))
+    # Level order: 1, 2, 3, 4, 5, -6, 7
+    assert aggregates.sums.tolist() == [16, 18, -3, 4, 12, -6, 7]
+    assert aggregates.mins.tolist() == [-6, 2, -6, 4, 5, -6, 7]
+    assert aggregates.max_path_sums.tolist() == [15, 14, -3, 4, 12, -6, 7]
+    assert aggregates.heights.tolist() == [3, 2, 1, 0, 1, 0, 0]
+    assert aggregates.sums[0] == tree_sum(root_node)
+    assert aggregates.max_path_sums[0] == tree_max_sum_path(root_node)
+
+
+def test_subtree_aggregates_match_recursive_functions():
+    _require_numpy()
+    root_node = complete_tree(1000)
+    aggregates = subtree_aggregates(CompactBinaryTree.from_nodes(root_node))
+    assert aggregates.sums[0] == tree_sum(root_node)
+    assert aggregates.mins[0] == 0
+    assert aggregates.max_path_sums[0] == tree_max_sum_path(root_node)
+    assert aggregates.heights[0] == 9
+
+
+def test_subtree_aggregates_floats_and_empty():
+    _require_numpy()
+    aggregates = subtree_aggregates(CompactBinaryTree.from_nodes(sample_tree(), typecode="d"))
+    assert aggregates.sums[0] == 16.0
+    assert aggregates.mins[0] == -6.0
+    assert aggregates.max_path_sums[0] == 15.0
+    empty = subtree_aggregates(CompactBinaryTree())
+    assert len(empty.sums) == len(empty.heights) == 0
+
+
+if __name__ == '__main__':
+    print("Vectorized subtree aggregates")
+    benchmark()